@@ -0,0 +1,161 @@
+import datetime
+import time
+import uuid
+
+import streamlit as st
+
+from background import ExecutorBusy, executor
+from interaction_log import get_sink as get_interaction_sink
+from metrics import timed
+from session_store import session_store
+from sweep import SWEEP_MAX_VARIANTS, make_variants, run_sweep
+
+# Shared helpers for the page modules. Heavier dependencies (xlsxwriter,
+# pyarrow) are imported inside the helpers that need them.
+
+
+# Initialize per-session state used by every page
+def init_session_state():
+    # Bumped on every saved interaction; exports are memoized per version.
+    # The interactions themselves are kept in session_store (see session_value).
+    if 'interactions_version' not in st.session_state:
+        st.session_state.interactions_version = 0
+
+    # Identifies this browser session to the shared background executor
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = uuid.uuid4().hex
+
+# Per-session values that can grow (the interaction log, chat history, datasets) live in
+# session_store rather than st.session_state, so their memory is accounted for and capped:
+# cold or over-cap values are spilled to disk and loaded back here when next read.
+# Values stored with cache=True are dropped instead of spilled and rebuilt by `factory`.
+def session_value(key, factory, cache=False):
+    return session_store.get(st.session_state.session_token, key, factory, cache=cache)
+
+# Save interaction locally in session state and queue it for the durable interaction log
+def save_interaction(student_name, prompt, response):
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    interaction = {
+        "Timestamp": timestamp,
+        "Student Name": student_name,
+        "Prompt": prompt,
+        "AI Response": response
+    }
+    session_value("interactions", list).append(interaction)
+    st.session_state.interactions_version += 1
+    sink = get_interaction_sink()
+    if sink is not None:
+        sink.record({**interaction, "Session": st.session_state.session_token})
+
+# Generate Excel from interactions
+@timed("generate_excel")
+def generate_excel(interactions=None):
+    from interaction_export import export_xlsx
+    return export_xlsx(session_value("interactions", list) if interactions is None else interactions)
+
+# Run CPU-heavy work on the shared background pool and wait for it with a progress bar.
+# Work submitted by a newer rerun for the same slot supersedes (cancels) older work,
+# and resubmitting the same key reuses the task that is running. The latest result of
+# each slot is kept in session_store (counted against the session's memory and dropped
+# under pressure) and the executor lets go of the task once it has been taken.
+# When the pool is too busy to take the work, a warning is shown and None is
+# returned: callers skip whatever needed the result.
+def run_in_background(slot, key, fn, label):
+    owner = st.session_state.session_token
+    held = session_store.get(owner, f"background:{slot}", lambda: None, cache=True)
+    if held is not None and held[0] == key:
+        return held[1]
+    try:
+        task = executor.submit(owner, slot, key, slot, fn)
+    except ExecutorBusy as e:
+        st.warning(str(e))
+        return None
+    if task.done():
+        result = task.result()
+    else:
+        progress_bar = st.progress(0.0, text=label)
+        try:
+            while True:
+                try:
+                    result = task.result(timeout=0.1)
+                    break
+                except TimeoutError:
+                    progress_bar.progress(task.progress, text=label)
+        finally:
+            progress_bar.empty()
+    session_store.put(owner, f"background:{slot}", (key, result), cache=True)
+    executor.release(owner, slot, task)
+    return result
+
+# Download button for the interaction log. The file is only built when the button is
+# clicked (on Streamlit's download thread) and is reused until new interactions arrive.
+def interactions_download_button(label, student_name, key):
+    from interaction_export import EXPORT_FORMATS, ExportMemo
+    export_memo = session_value("export_memo", ExportMemo, cache=True)
+    interactions = session_value("interactions", list)
+    export_format = st.selectbox("File format:", list(EXPORT_FORMATS), key=f"{key}_format")
+    extension, mime, _ = EXPORT_FORMATS[export_format]
+    st.download_button(
+        label=label,
+        data=export_memo.lazy(interactions, len(interactions), st.session_state.interactions_version, export_format),
+        file_name=f"{student_name}_interactions.{extension}",
+        mime=mime,
+        key=key
+    )
+
+# Render streamed text through `render` (e.g. placeholder.markdown), throttled so
+# long completions don't flood the browser with updates
+def stream_into(render, interval=0.05):
+    last_render = [0.0]
+    def on_token(text):
+        now = time.monotonic()
+        if now - last_render[0] >= interval:
+            last_render[0] = now
+            render(text + " ▌")
+    return on_token
+
+# Temperatures offered in a parameter sweep
+SWEEP_TEMPERATURES = [0.0, 0.3, 0.7, 1.0]
+
+# Model, temperature and response-length choices for a parameter sweep,
+# returned as every combination of them (sweep.Variant)
+def sweep_controls(key, models, max_tokens_options, default_max_tokens):
+    chosen_models = st.multiselect("Models:", models, default=models[:1], key=f"{key}_models")
+    temperatures = st.multiselect("Temperatures:", SWEEP_TEMPERATURES, default=[0.0, 0.7, 1.0], key=f"{key}_temperatures")
+    lengths = st.multiselect("Max tokens:", max_tokens_options, default=[default_max_tokens], key=f"{key}_max_tokens")
+    variants = make_variants(chosen_models, temperatures, lengths)
+    if len(variants) > SWEEP_MAX_VARIANTS:
+        st.warning(f"That is {len(variants)} combinations; only the first {SWEEP_MAX_VARIANTS} will be sent.")
+        variants = variants[:SWEEP_MAX_VARIANTS]
+    return variants
+
+# Send one prompt to every variant at once and fill in a grid of columns as the
+# responses arrive. `call(variant, on_completion)` makes one request; the
+# results are returned in variant order.
+def render_sweep(variants, call, per_row=4):
+    cells = []
+    for row_start in range(0, len(variants), per_row):
+        for column, variant in zip(st.columns(per_row), variants[row_start:row_start + per_row]):
+            column.markdown(f"**{variant.label}**")
+            cells.append(column.empty())
+    for cell in cells:
+        cell.info("Waiting for response...")
+
+    results = [None] * len(variants)
+    start = time.perf_counter()
+    for position, result in run_sweep(variants, call):
+        results[position] = result
+        with cells[position].container():
+            if result.ok:
+                st.write(result.response)
+                cached = " (cached)" if result.cached else ""
+                answered_by = f" · answered by {result.model}" if result.model and result.model != result.variant.model else ""
+                st.caption(f"{result.latency:.2f} s{cached} · {result.prompt_tokens} prompt + "
+                           f"{result.completion_tokens} completion tokens{answered_by}")
+            else:
+                st.error(result.error)
+    if results:
+        slowest = max(result.latency for result in results)
+        st.caption(f"{len(results)} responses in {time.perf_counter() - start:.2f} s "
+                   f"(slowest single call {slowest:.2f} s)")
+    return results
@@ -0,0 +1,158 @@
+import streamlit as st
+
+from app_pages.common import render_sweep, session_value, stream_into, sweep_controls
+from chat_context import ConversationContext
+from llm_client import complete
+from metrics import timed
+from retrieval import retrieve_context
+from token_budget import estimate_tokens
+
+# Knowledge-base excerpts retrieved into the system prompt may use this share
+# of the conversation memory budget, up to KNOWLEDGE_BASE_CONTEXT_TOKENS
+KNOWLEDGE_BASE_CONTEXT_SHARE = 0.5
+KNOWLEDGE_BASE_CONTEXT_TOKENS = 1500
+# Chat history is paged in blocks of this many messages: the newest one or two
+# blocks are shown as chat bubbles, older ones load on request
+CHAT_HISTORY_PAGE = 20
+# Characters of the persona and knowledge base shown in the collapsed system entry
+SYSTEM_PREVIEW_CHARS = 1000
+
+# Function to generate AI response
+@timed("fetch_ai_response")
+def fetch_ai_response(api_key, prompt, model, temperature, max_tokens, on_token=None, system=None, history=None,
+                      on_completion=None):
+    messages = list(history or []) + [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    completion = complete(api_key, messages, model, temperature, max_tokens, on_token=on_token)
+    if on_completion is not None:
+        on_completion(completion)
+    return completion.text
+
+# Prompt context for one question: the persona grounded in the relevant
+# knowledge-base excerpts, plus recent turns and a summary of older ones,
+# all within the memory budget
+def build_context(chat_context, persona, kb_content, history, user_input):
+    system = persona
+    if kb_content:
+        budget = min(KNOWLEDGE_BASE_CONTEXT_TOKENS,
+                     int(chat_context.max_tokens * KNOWLEDGE_BASE_CONTEXT_SHARE)
+                     - estimate_tokens(persona) - estimate_tokens(user_input))
+        excerpts = retrieve_context(kb_content, user_input, max(0, budget))
+        if excerpts:
+            system = f"{persona}\n\nRelevant knowledge base excerpts:\n{excerpts}"
+    return chat_context.build(system, history, user_input)
+
+# One block of older messages as a single markdown transcript
+def transcript_markdown(messages):
+    return "\n\n---\n\n".join(f"**{m['role'].capitalize()}:** {m['content']}" for m in messages)
+
+def _load_older_messages():
+    st.session_state.chat_pages_loaded = st.session_state.get("chat_pages_loaded", 0) + 1
+
+# Render the chat history in constant work per rerun: the system entry (persona
+# plus knowledge base) as a collapsed preview, the latest page or two as chat
+# bubbles, and older pages only once "Load older messages" asks for them. Pages
+# before the bubbles never change, so each one's transcript is built once.
+def render_chat_history(messages):
+    start = 0
+    if messages and messages[0]["role"] == "system":
+        start = 1
+        system = messages[0]["content"]
+        with st.expander("Persona and knowledge base"):
+            st.text(system[:SYSTEM_PREVIEW_CHARS])
+            if len(system) > SYSTEM_PREVIEW_CHARS:
+                st.caption(f"Showing the first {SYSTEM_PREVIEW_CHARS:,} of {len(system):,} characters.")
+
+    count = len(messages) - start
+    bubbles_from = max(0, count - CHAT_HISTORY_PAGE) // CHAT_HISTORY_PAGE * CHAT_HISTORY_PAGE
+    older_pages = bubbles_from // CHAT_HISTORY_PAGE
+    loaded = min(st.session_state.get("chat_pages_loaded", 0), older_pages)
+    if loaded < older_pages:
+        st.button(f"Load older messages ({(older_pages - loaded) * CHAT_HISTORY_PAGE} hidden)",
+                  key="load_older_messages", on_click=_load_older_messages)
+    transcripts = session_value("chat_transcripts", dict, cache=True)
+    for page in range(older_pages - loaded, older_pages):
+        if page not in transcripts:
+            first = start + page * CHAT_HISTORY_PAGE
+            transcripts[page] = transcript_markdown(messages[first:first + CHAT_HISTORY_PAGE])
+        with st.container(border=True):
+            st.markdown(transcripts[page])
+
+    for msg in messages[start + bubbles_from:]:
+        st.chat_message(msg["role"]).markdown(msg["content"])
+
+# Custom GPT Page
+def custom_gpt_page():
+    gpt_name = st.sidebar.text_input("Give your GPT a name:", "CyberTutor")
+    
+    # Require API Key first
+    api_key = st.sidebar.text_input("Enter OpenAI API Key:", type="password")
+    
+    # User input for model configuration
+    persona = st.sidebar.text_area("Persona Instructions", "You are an AI tutor specializing in cybersecurity.")
+    model = st.sidebar.radio("Choose Model:", ["gpt-4", "gpt-3.5-turbo"], index=0)
+    temperature = st.sidebar.slider("Creativity (Temperature)", 0.0, 1.0, 0.7)
+    max_tokens = st.sidebar.slider("Max Tokens", 50, 2000, 500)
+    context_tokens = st.sidebar.slider("Conversation Memory (prompt tokens)", 500, 8000, 3000, 100)
+    
+    # Upload optional knowledge base
+    uploaded_file = st.sidebar.file_uploader("Upload a Knowledge Base (TXT)", type=["txt"])
+    kb_content = ""
+    if uploaded_file is not None:
+        kb_content = uploaded_file.read().decode("utf-8")
+    
+    # Initialize chat history
+    messages = session_value("messages", lambda: [{"role": "system", "content": persona + "\n" + kb_content}])
+    chat_context = session_value("chat_context", ConversationContext)
+    chat_context.max_tokens = context_tokens
+    
+    # Display chat history
+    render_chat_history(messages)
+    
+# User input
+    user_input = st.text_area("Ask me anything:", key="user_input", placeholder="Type your message here...")
+    if st.button("Send"):
+        if user_input:
+            history = [m for m in messages if m["role"] != "system"]
+            messages.append({"role": "user", "content": user_input})
+            st.chat_message("user").write(user_input)
+            
+            context = build_context(chat_context, persona, kb_content, history, user_input)
+
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                completions = []
+                try:
+                    response = fetch_ai_response(
+                        api_key, user_input, model, temperature, max_tokens,
+                        on_token=stream_into(placeholder.markdown), system=context.system, history=context.history,
+                        on_completion=completions.append
+                    )
+                except Exception as e:
+                    # Leave the question out of the history so it can simply be sent again
+                    messages.pop()
+                    placeholder.error(f"Error: {str(e)}")
+                    response = None
+                else:
+                    placeholder.markdown(response)
+                    st.caption(f"Prompt size: ~{context.prompt_tokens} tokens")
+                    if completions and completions[-1].fallback_from:
+                        st.caption(f"Answered by {completions[-1].model} because {model} is responding slowly right now.")
+            
+            if response is not None:
+                messages.append({"role": "assistant", "content": response})
+
+    # Sweep: ask the same question with several settings at once, without adding to the chat
+    with st.expander("Compare Models and Settings"):
+        variants = sweep_controls("custom_gpt_sweep", ["gpt-4", "gpt-3.5-turbo"], [100, 250, 500, 1000], 500)
+        if st.button("Run Comparison"):
+            if variants and user_input:
+                history = [m for m in messages if m["role"] != "system"]
+                context = build_context(chat_context, persona, kb_content, history, user_input)
+                render_sweep(variants, lambda variant, on_completion: fetch_ai_response(
+                    api_key, user_input, variant.model, variant.temperature, variant.max_tokens,
+                    system=context.system, history=context.history, on_completion=on_completion
+                ))
+            else:
+                st.error("Please pick at least one setting of each kind and type a message to compare.")
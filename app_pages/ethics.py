@@ -0,0 +1,16 @@
+import streamlit as st
+
+# Ethics in AI Page
+def ethics_in_ai_page():
+    st.title("Ethics in AI")
+    st.write("This page covers the ethical considerations when building and using AI systems.")
+    st.subheader("Watch the Ethics in AI Video")
+    st.video("https://youtu.be/muLPOvIEtaw?si=VkX-Vma888dwDkDA")
+
+    st.subheader("Key Ethical Topics")
+    st.write("""
+    - **Bias in AI**: How algorithms can perpetuate societal biases.
+    - **Transparency**: The need for clear communication on how AI makes decisions.
+    - **Privacy**: Protecting user data and ensuring AI systems respect privacy.
+    - **Accountability**: Defining who is responsible for the decisions made by AI systems.
+    """)
@@ -0,0 +1,159 @@
+import streamlit as st
+
+from app_pages.common import (
+    interactions_download_button, render_sweep, run_in_background, save_interaction, stream_into, sweep_controls
+)
+from example_store import EXAMPLES_K, EXAMPLES_MAX_TOKENS, examples_key, get_store, load_examples
+from llm_client import complete
+from metrics import timed
+
+# Generate AI Response with Custom Parameters
+@timed("generate_response_with_params")
+def generate_response_with_params(api_key, prompt, temperature, max_tokens, on_token=None, model="gpt-3.5-turbo",
+                                  on_completion=None):
+    messages = [{"role": "user", "content": prompt}]
+    completion = complete(api_key, messages, model, temperature, max_tokens, on_token=on_token)
+    if on_completion is not None:
+        on_completion(completion)
+    return completion.text
+
+# Training examples offered on the Fine-Tuning page
+RESTAURANT_EXAMPLES = [
+    {"review": "The pasta was amazing!", "response": "Thank you! We're thrilled you enjoyed it."},
+    {"review": "The service was slow.", "response": "We apologize for the delay and will work to improve."},
+    {"review": "Do you have vegan options?", "response": "Yes, we offer several vegan dishes. Let me assist you!"},
+    {"review": "The ambiance was perfect.", "response": "Thank you! We're glad you liked the atmosphere."},
+    {"review": "The food was overpriced.", "response": "We appreciate your feedback and will review our pricing."},
+    {"review": "Can you recommend a gluten-free dessert?", "response": "Certainly! We have a delicious gluten-free chocolate cake."},
+    {"review": "The delivery was late.", "response": "We sincerely apologize for the delay. We are working on improving our delivery times."},
+    {"review": "The waiter was very rude.", "response": "We are sorry to hear about your experience. We will address this with our staff."},
+    {"review": "I loved the ambiance, but the food was cold.", "response": "Thank you for the feedback! We are glad you enjoyed the ambiance and will work on serving hot food."},
+    {"review": "The vegetarian options are limited.", "response": "We appreciate your input and will expand our vegetarian menu soon."}
+]
+
+# Example store over the built-in examples plus an uploaded JSONL/CSV file,
+# indexed once per file
+def load_example_store(data, filename):
+    return get_store(examples_key(data), RESTAURANT_EXAMPLES + load_examples(data, filename))
+
+# Few-shot prompt built from the selected examples and the review to answer
+def build_few_shot_prompt(examples, review):
+    lines = ["You are a chatbot trained to handle restaurant reviews. Here are some examples:"]
+    for example in examples:
+        lines.append(f"Review: {example['review']}\nResponse: {example['response']}")
+    lines.append(f"\nNow respond to this review:\nReview: {review}\nResponse:")
+    return "\n".join(lines)
+
+# Fine-Tuning LLM Models Page
+def fine_tuning_page():
+    st.title("Fine-Tuning LLM Models")
+    st.write("""
+    This page introduces fine-tuning large language models (LLMs) in a simplified, interactive way.
+    Fine-tuning allows AI to specialize for specific tasks by adjusting its responses using example data.
+    """)
+
+    # Scenario Description
+    st.subheader("Scenario: Fine-Tuning a Chatbot for Restaurant Reviews")
+    st.write("""
+    Imagine we are customizing a chatbot to handle restaurant reviews. You can select training examples 
+    and adjust parameters to observe how the chatbot's responses change.
+    """)
+
+    # Dataset Customization
+    st.subheader("Step 1: Select Training Examples")
+    excluded_examples = []
+    for i, example in enumerate(RESTAURANT_EXAMPLES):
+        if not st.checkbox(f"Include Example {i+1}: '{example['review']}'", value=True):
+            excluded_examples.append(i)
+
+    # Larger example sets: only the examples most similar to the test review go into the prompt
+    example_file = st.file_uploader("Add your own examples (JSONL or CSV with review and response)", type=["jsonl", "csv"])
+    store = get_store("built-in", RESTAURANT_EXAMPLES)
+    examples_per_prompt = EXAMPLES_K
+    if example_file:
+        try:
+            uploaded_store = run_in_background(
+                "example_store", example_file.file_id,
+                lambda task: load_example_store(example_file.getvalue(), example_file.name), "Indexing examples..."
+            )
+        except (ValueError, UnicodeDecodeError) as e:
+            st.error(f"Could not read the examples: {str(e)}")
+            uploaded_store = None
+        if uploaded_store is not None:
+            store = uploaded_store
+            examples_per_prompt = st.slider("Examples per prompt:", 1, 50, EXAMPLES_K)
+            st.caption(
+                f"{len(store):,} examples available. The {examples_per_prompt} most similar to your review "
+                f"(up to {EXAMPLES_MAX_TOKENS:,} tokens) are added to the prompt."
+            )
+
+    # Parameter Tuning
+    st.subheader("Step 2: Adjust Parameters")
+    st.write("""
+    Adjust the parameters below to influence how the model responds:
+    - **Creativity (Temperature):** Higher values (e.g., 1.0) make responses more creative and random. Lower values (e.g., 0.0) make them more deterministic.
+    - **Response Length (Max Tokens):** Adjust the length of the chatbot's response.
+    """)
+    temperature = st.slider("Creativity Level (Temperature)", 0.0, 1.0, 0.7)
+    max_tokens = st.slider("Maximum Response Length (Tokens)", 10, 100, 50)
+
+    # Testing the Chatbot
+    st.subheader("Step 3: Test the Fine-Tuned Chatbot")
+    api_key = st.text_input("Enter your OpenAI API Key:", type="password")
+    student_name = st.text_input("Enter your name:")
+    test_review = st.text_input("Enter a sample review:")
+
+    if st.button("Generate Response"):
+        selected_examples = store.select(test_review, examples_per_prompt, exclude=excluded_examples) if test_review else []
+        if selected_examples and test_review and api_key and student_name:
+            try:
+                # Simulate response generation based on selected examples
+                prompt = build_few_shot_prompt(selected_examples, test_review)
+
+                placeholder = st.empty()
+                response = generate_response_with_params(
+                    api_key, prompt, temperature, max_tokens,
+                    on_token=stream_into(lambda text: placeholder.success(f"Chatbot Response: {text}"))
+                )
+                placeholder.success(f"Chatbot Response: {response}")
+
+                # Save interaction
+                save_interaction(student_name, test_review, response)
+
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+        else:
+            st.error("Please select examples, enter a review, provide your API key, and your name to test the chatbot.")
+
+    # Sweep: the same prompt against several settings at once, side by side
+    with st.expander("Compare Settings Side by Side"):
+        variants = sweep_controls("fine_tuning_sweep", ["gpt-3.5-turbo", "gpt-4"], [25, 50, 100], 50)
+        if st.button("Run Comparison"):
+            selected_examples = store.select(test_review, examples_per_prompt, exclude=excluded_examples) if test_review else []
+            if variants and selected_examples and test_review and api_key and student_name:
+                prompt = build_few_shot_prompt(selected_examples, test_review)
+                results = render_sweep(variants, lambda variant, on_completion: generate_response_with_params(
+                    api_key, prompt, variant.temperature, variant.max_tokens,
+                    model=variant.model, on_completion=on_completion
+                ))
+                for result in results:
+                    if result.ok:
+                        save_interaction(student_name, test_review, f"[{result.variant.label}] {result.response}")
+            else:
+                st.error("Please pick at least one setting of each kind, select examples, enter a review, "
+                         "provide your API key, and your name to run the comparison.")
+
+    # Provide Download Option for Interactions
+    if st.session_state.interactions_version:
+        st.subheader("Step 4: Download Your Interactions")
+        st.write("Download your interactions as an Excel file and upload it to Canvas.")
+        interactions_download_button("Download Interactions", student_name, "fine_tuning_download")
+
+    # Reflection Section
+    st.subheader("Reflection Questions")
+    st.write("""
+    1. How did the selected examples influence the chatbot's response?
+    2. How does adjusting the creativity level (temperature) affect the chatbot's behavior?
+    3. What are the limitations of fine-tuning with a small dataset?
+    4. What happens when you add or remove specific types of examples (e.g., complaints, compliments)?
+    """)
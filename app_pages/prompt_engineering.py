@@ -0,0 +1,173 @@
+import time
+
+import streamlit as st
+
+from app_pages.common import interactions_download_button, run_in_background, save_interaction, stream_into
+from batch_eval import BATCH_CONCURRENCY, read_prompt_csv, run_batch
+from llm_client import complete
+from metrics import timed
+from pdf_text import extract_text_cached, read_upload_bytes
+from retrieval import document_key, retrieve_context
+
+# Set max token limit (GPT-3.5 & GPT-4 support ~16,385 tokens, but we use less)
+MAX_TEXT_LENGTH = 3000  # Limit input text to first 3,000 words (~12,000 tokens)
+# Token budgets for document excerpts retrieved into prompts
+WARRANTY_CONTEXT_TOKENS = 3000
+
+# Function to truncate long text
+def truncate_text(text, max_words=MAX_TEXT_LENGTH):
+    words = text.split()
+    if len(words) > max_words:
+        return " ".join(words[:max_words]) + "...\n\n[Text truncated due to length]"
+    return text
+
+# Generate AI Response with OpenAI API (streams tokens to on_token when given)
+@timed("generate_response")
+def generate_response(api_key, prompt, on_token=None):
+    messages = [{"role": "user", "content": prompt}]
+    return complete(api_key, messages, "gpt-4-turbo", 0.5, 1000, on_token=on_token).text
+
+# Function to extract text from PDF using PyPDF2 (cached by file content across reruns and sessions)
+@timed("extract_text_from_pdf")
+def extract_text_from_pdf(uploaded_pdf, max_words=None):
+    try:
+        text = extract_text_cached(read_upload_bytes(uploaded_pdf), max_words=max_words)
+        return text if text.strip() else "No readable text found in PDF."
+    except Exception as e:
+        return f"Error extracting text from PDF: {str(e)}"
+
+# Prompt asking the model to judge a customer's issue against warranty excerpts
+def build_warranty_prompt(warranty_text, prompt):
+    return f"""
+            You are a warranty specialist assisting a customer. Below is the warranty document text:
+            
+            {warranty_text}
+            
+            The customer has this issue with their product:
+            {prompt}
+            
+            Based on the warranty terms, determine if this issue qualifies for a claim. Explain why or why not.
+            """
+
+# Evaluate every prompt of a class against one warranty document, several at a
+# time. The document is extracted and indexed once; each finished evaluation is
+# saved to the interaction log straight away, so the export fills in as it runs.
+def evaluate_prompt_batch(api_key, uploaded_file, items, concurrency):
+    document_text = run_in_background(
+        "pdf_full", uploaded_file.file_id, lambda task: extract_text_from_pdf(uploaded_file), "Reading the PDF..."
+    )
+    if document_text is None:
+        return
+    doc_key = document_key(document_text)
+
+    def evaluate(item):
+        warranty_text = retrieve_context(document_text, item.prompt, WARRANTY_CONTEXT_TOKENS, doc_key=doc_key)
+        return generate_response(api_key, build_warranty_prompt(warranty_text, item.prompt))
+
+    progress_bar = st.progress(0.0, text=f"Evaluating {len(items)} prompts...")
+    table = st.empty()
+    rows = []
+
+    def on_result(result):
+        if result.ok:
+            save_interaction(result.item.student_name, result.item.prompt, result.response)
+        rows.append({
+            "Student Name": result.item.student_name,
+            "Prompt": result.item.prompt,
+            "AI Response": result.response if result.ok else f"Error: {result.error}",
+            "Attempts": result.attempts,
+            "Seconds": round(result.latency, 1),
+        })
+        progress_bar.progress(len(rows) / len(items), text=f"Evaluated {len(rows)} of {len(items)} prompts")
+        if len(rows) % 10 == 0 or len(rows) == len(items):
+            table.dataframe(rows, use_container_width=True)
+
+    start = time.perf_counter()
+    results = run_batch(items, evaluate, concurrency, on_result=on_result)
+    failed = sum(not result.ok for result in results)
+    st.success(f"Evaluated {len(results) - failed} of {len(results)} prompts in {time.perf_counter() - start:.0f} s.")
+    if failed:
+        st.warning(f"{failed} prompts failed after retries; their errors are shown in the table.")
+
+# Prompt Engineering Assignment Page with Text Extraction
+def prompt_engineering_assignment_page():
+    st.title("Prompt Engineering Assignment: Warranty Analysis")
+
+    # Step 1: Enter API Key & Student Name
+    api_key = st.text_input("Enter your OpenAI API Key:", type="password")
+    student_name = st.text_input("Enter your name:")
+
+    # Step 2: Upload Warranty Document
+    st.subheader("Upload the Warranty Document (PDF Only)")
+    uploaded_file = st.file_uploader("Upload a PDF file", type=["pdf"])
+
+    extracted_text = ""
+    truncated_text = ""
+    
+    if uploaded_file:
+        # Stop parsing once the document is past the prompt budget
+        extracted_text = run_in_background(
+            "pdf_preview", (uploaded_file.file_id, MAX_TEXT_LENGTH),
+            lambda task: extract_text_from_pdf(uploaded_file, max_words=MAX_TEXT_LENGTH), "Reading the PDF..."
+        )
+        if extracted_text is not None:
+            truncated_text = truncate_text(extracted_text)  # Truncate long text
+
+            # Display extracted text (showing truncated if applicable)
+            st.subheader("Extracted Warranty Text (Truncated if too long):")
+            st.text_area("Text from the document:", truncated_text, height=200)
+
+    # Step 3: Writing an Effective Prompt
+    st.subheader("Write an Effective Prompt")
+    prompt = st.text_area("Write your prompt here:")
+
+    # Generate AI Response Button
+    generate_button = st.button("Generate AI Response")
+
+    if generate_button:
+        if api_key and student_name and prompt and uploaded_file:
+            document_text = run_in_background(
+                "pdf_full", uploaded_file.file_id, lambda task: extract_text_from_pdf(uploaded_file), "Reading the PDF..."
+            )
+            if document_text is not None:
+                # Send only the parts of the warranty most relevant to the student's prompt
+                warranty_text = retrieve_context(document_text, prompt, WARRANTY_CONTEXT_TOKENS)
+                full_prompt = build_warranty_prompt(warranty_text, prompt)
+
+                try:
+                    st.subheader("AI Warranty Evaluation:")
+                    placeholder = st.empty()
+                    response = generate_response(api_key, full_prompt, on_token=stream_into(placeholder.markdown))
+                    placeholder.markdown(response)
+                    save_interaction(student_name, prompt, response)
+                    st.success("Your interaction has been saved locally!")
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
+        else:
+            st.error("Please provide your name, API key, warranty document, and a prompt.")
+
+    # Instructor batch mode: evaluate a whole section's prompts at once
+    with st.expander("Instructor: Batch Evaluation"):
+        st.write("""
+        Upload a CSV with a **Prompt** column (and optionally **Student Name**) to evaluate every prompt
+        against the warranty document above. Results are added to the interaction log as they finish.
+        """)
+        prompts_file = st.file_uploader("Upload student prompts (CSV)", type=["csv"], key="batch_prompts")
+        concurrency = st.slider("Concurrent requests:", 1, 32, BATCH_CONCURRENCY, key="batch_concurrency")
+        if st.button("Evaluate All Prompts", key="batch_evaluate"):
+            if api_key and uploaded_file and prompts_file:
+                try:
+                    items = read_prompt_csv(prompts_file.getvalue())
+                except (ValueError, UnicodeDecodeError) as e:
+                    st.error(f"Could not read the CSV: {str(e)}")
+                else:
+                    if items:
+                        evaluate_prompt_batch(api_key, uploaded_file, items, concurrency)
+                    else:
+                        st.warning("The CSV has no prompts to evaluate.")
+            else:
+                st.error("Please provide your API key, the warranty document, and a CSV of prompts.")
+
+    # Download Student Logs
+    if st.session_state.interactions_version:
+        interactions_download_button("Download Interactions", student_name, "prompt_engineering_download")
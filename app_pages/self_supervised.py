@@ -0,0 +1,66 @@
+import streamlit as st
+from PIL import UnidentifiedImageError
+
+from app_pages.common import run_in_background
+from image_pipeline import ingest_image, inpaint_image, mask_image, new_mask_seed
+
+# Self-Supervised Learning Page
+def self_supervised_learning_page():
+    st.title("Introduction to Self-Supervised Learning")
+    st.write("""
+    Self-supervised learning (SSL) is a way for machines to learn from data without labels. 
+    In this exercise, you will upload an image, mask a portion of it, and observe how AI regenerates the missing part using a lightweight OpenCV method.
+    """)
+
+    # Step 1: Upload an Image
+    st.subheader("Step 1: Upload an Image")
+    uploaded_file = st.file_uploader("Upload an Image (JPG or PNG)", type=["jpg", "png", "jpeg"])
+    if uploaded_file is not None:
+        # Decoded and downscaled once per file; reruns reuse the same pixel buffer
+        try:
+            image = ingest_image(uploaded_file.getvalue())
+        except (UnidentifiedImageError, OSError) as e:
+            st.error(f"Could not read the image: {str(e)}")
+            return
+        st.image(image.pixels, caption="Original Image", use_container_width=True)
+        if image.downscaled:
+            st.caption(f"Resized from {image.original_size[0]}x{image.original_size[1]} for faster processing.")
+
+        # Step 2: Adjust Mask Size
+        st.subheader("Step 2: Adjust Mask Size")
+        mask_size = st.slider("Select Mask Size (percentage of image):", 10, 50, 30)
+
+        # Keep the mask position stable across reruns until the student asks for a new one
+        move_mask = st.button("Move Mask")
+        if move_mask or st.session_state.get("mask_image_key") != image.key:
+            st.session_state.mask_image_key = image.key
+            st.session_state.mask_seed = new_mask_seed()
+
+        masked_image, mask = mask_image(image, mask_size, st.session_state.mask_seed)
+        st.image(masked_image, caption=f"Masked Image ({mask_size}% masked)", use_container_width=True)
+
+        # Step 3: Regenerate the Masked Area Using OpenCV
+        st.subheader("Step 3: Regenerate the Masked Area")
+        inpaint_mode = st.radio(
+            "Regeneration Mode:", ["Fast (multi-scale)", "Full resolution"], horizontal=True
+        )
+        mode = "pyramid" if inpaint_mode == "Fast (multi-scale)" else "direct"
+        if st.button("Regenerate Masked Area"):
+            try:
+                inpainted_image = run_in_background(
+                    "inpaint", (image.key, mask_size, st.session_state.mask_seed, mode),
+                    lambda task: inpaint_image(image.pixels, mask, mode=mode, task=task),
+                    "Regenerating the masked area..."
+                )
+                if inpainted_image is not None:
+                    st.image(inpainted_image, caption="Regenerated Image", use_container_width=True)
+            except Exception as e:
+                st.error(f"Error during inpainting: {str(e)}")
+
+        # Reflection Questions
+        st.write("### Reflection Questions:")
+        st.write("""
+        1. How does the regenerated image compare to the original?
+        2. How does the mask size affect the quality of regeneration?
+        3. What are the limitations of this lightweight inpainting method?
+        """)
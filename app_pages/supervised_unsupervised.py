@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app_pages.common import session_value
+from cluster_plot import cluster_plot_png
+from clustering import cluster_points, data_hash, gaussian_mixture, read_numeric_csv
+
+# Sample product data for the clustering example (generated once per session)
+def sample_product_data():
+    return pd.DataFrame({
+        'Price': np.concatenate([
+            np.random.randint(10, 100, 30),  # Low-price products
+            np.random.randint(100, 300, 40),  # Mid-price products
+            np.random.randint(300, 500, 30)  # High-price products
+        ]),
+        'Rating': np.concatenate([
+            np.random.uniform(1, 2.5, 30),  # Lower ratings
+            np.random.uniform(2.5, 4, 40),  # Medium ratings
+            np.random.uniform(4, 5, 30)  # High ratings
+        ]).round(1)
+    })
+
+# Supervised and Unsupervised Learning Page
+def supervised_unsupervised_page():
+    st.title("Supervised and Unsupervised Learning")
+    st.write("""
+    This page introduces supervised and unsupervised machine learning concepts with interactive examples in finance and marketing.
+    """)
+
+    # Supervised Learning Section
+    st.header("Supervised Learning")
+    st.write("Supervised learning predicts outcomes based on labeled data.")
+    st.write("### Example: Predicting Loan Approval")
+
+    st.write("Select values for Income and Credit Score to see if a loan would be approved.")
+    income = st.slider("Income (in $):", 2000, 20000, 8000, 100)
+    credit_score = st.slider("Credit Score:", 300, 850, 650, 10)
+    approval = "Approved" if (income > 5000 and credit_score > 600) else "Rejected"
+    st.write(f"Loan Status: **{approval}**")
+
+    # Unsupervised Learning Section
+    st.header("Unsupervised Learning")
+    st.write("Unsupervised learning identifies patterns in unlabeled data.")
+    st.write("### Example: Clustering Products Based on Price and Rating")
+
+    data_source = st.radio(
+        "Choose a dataset:", ["Sample products", "Synthetic clusters", "Upload your own CSV"], horizontal=True
+    )
+    if data_source == "Sample products":
+        product_data = session_value("product_data", sample_product_data)
+        x_label, y_label = 'Price ($)', 'Rating (1-5)'
+        points = product_data[['Price', 'Rating']].to_numpy(dtype=np.float32)
+    elif data_source == "Synthetic clusters":
+        n_points = st.select_slider(
+            "Number of points:", [1_000, 10_000, 100_000, 1_000_000], value=10_000
+        )
+        true_clusters = st.slider("Number of hidden groups:", 2, 10, 4)
+        points, _ = gaussian_mixture(n_points, true_clusters, seed=7)
+        x_label, y_label = 'Feature 1', 'Feature 2'
+    else:
+        csv_file = st.file_uploader("Upload a CSV file", type=["csv"])
+        if csv_file is None:
+            st.info("Upload a CSV with at least two numeric columns to cluster it.")
+            points = None
+        else:
+            try:
+                numeric_data = read_numeric_csv(csv_file.getvalue())
+            except Exception as e:
+                st.error(f"Could not read the CSV: {str(e)}")
+                numeric_data = pd.DataFrame()
+            if numeric_data.shape[1] < 2:
+                st.error("The CSV needs at least two numeric columns.")
+                points = None
+            else:
+                columns = list(numeric_data.columns)
+                x_label = st.selectbox("X axis column:", columns, index=0)
+                y_label = st.selectbox("Y axis column:", columns, index=1)
+                points = numeric_data[[x_label, y_label]].dropna().to_numpy()
+                if len(points) == 0:
+                    st.error("No row of the CSV has values in both selected columns.")
+                    points = None
+
+    if points is not None:
+        k = st.slider("Number of clusters (k):", 2, 10, 3)
+        if len(points) < k:
+            st.error(f"Only {len(points)} rows have values in both columns; {k} clusters need at least {k}.")
+        else:
+            points_hash = data_hash(points)
+            # Mini-batch k-means, memoized per (dataset, k, seed)
+            result = cluster_points(points, k, seed=0, points_hash=points_hash)
+            cluster_labels = result.labels + 1
+            selected_cluster = st.selectbox("Select a Cluster to Highlight:", list(range(1, k + 1)))
+
+            plot_png = cluster_plot_png(
+                f"{points_hash}-{k}", points[:, 0], points[:, 1], cluster_labels,
+                selected_cluster, x_label, y_label
+            )
+            st.image(plot_png, use_container_width=True)
+            sizes = np.bincount(cluster_labels, minlength=k + 1)[1:]
+            st.write(f"Cluster {selected_cluster} contains **{sizes[selected_cluster - 1]:,}** of {len(points):,} points.")
+
+    # Reflection Section
+    st.header("Reflection Questions")
+    st.write("""
+    1. What factors might influence the loan approval decision?
+    2. What insights can you gain about product clusters based on price and ratings?
+    """)
+    st.text_area("Your Reflections:")
@@ -0,0 +1,91 @@
+from functools import lru_cache
+
+
+# CSS for a theme, built once per process instead of on every rerun
+@lru_cache(maxsize=None)
+def page_style(theme):
+    if theme == 'Light':
+        page_bg_color = "#FFFFFF"
+        font_color = "#000000"
+        sidebar_bg_color = "#F0F0F0"
+        button_bg_color = "#4CAF50"
+        button_hover_color = "#3E8E41"
+        input_bg_color = "#FFFFFF"
+        input_focus_color = "#4CAF50"
+        dropdown_bg_color = "#FFFFFF"
+        dropdown_text_color = "#000000"
+        dropdown_hover_bg_color = "#E0E0E0"
+    else:
+        page_bg_color = "#2E2E2E"
+        font_color = "#FFFFFF"
+        sidebar_bg_color = "#1E1E1E"
+        button_bg_color = "#007BFF"
+        button_hover_color = "#0056b3"
+        input_bg_color = "#3E3E3E"
+        input_focus_color = "#007BFF"
+        dropdown_bg_color = "#444444"
+        dropdown_text_color = "#FFFFFF"
+        dropdown_hover_bg_color = "#555555"
+
+    page_style = f"""
+        <style>
+        .stApp {{
+            background-color: {page_bg_color};
+        }}
+        h1, h2, h3, h4, h5, p, div {{
+            font-family: 'Arial', sans-serif;
+            font-weight: bold;
+            font-size: 18px;
+            color: {font_color};
+        }}
+        section[data-testid="stSidebar"] {{
+            background-color: {sidebar_bg_color};
+        }}
+        section[data-testid="stSidebar"] * {{
+            color: {font_color} !important;
+        }}
+        input, textarea {{
+            background-color: {input_bg_color};
+            color: {font_color};
+            border: 1px solid #555555; /* Neutral border color */
+            border-radius: 5px;
+            padding: 5px;
+        }}
+        input:focus, textarea:focus {{
+            border: 1px solid {input_focus_color};
+            outline: none;
+        }}
+        button {{
+            background-color: {button_bg_color} !important;
+            color: white !important;
+            border: none;
+            border-radius: 5px;
+            padding: 10px;
+            font-weight: bold;
+            transition: background-color 0.3s;
+        }}
+        button:hover {{
+            background-color: {button_hover_color} !important;
+        }}
+        div[data-baseweb="select"] > div {{
+            background-color: {dropdown_bg_color};
+            color: {dropdown_text_color};
+            border-radius: 5px;
+            padding: 10px;
+            border: 1px solid {input_focus_color};
+        }}
+        div[data-baseweb="select"] > div:hover {{
+            background-color: {dropdown_hover_bg_color};
+        }}
+        div[role="listbox"] {{
+            background-color: {dropdown_bg_color};
+        }}
+        div[role="listbox"] ul li {{
+            color: {dropdown_text_color};
+        }}
+        div[role="listbox"] ul li:hover {{
+            background-color: {dropdown_hover_bg_color};
+        }}
+        </style>
+    """
+    return page_style
@@ -0,0 +1,164 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from metrics import registry
+
+BACKGROUND_WORKERS = int(os.environ.get("BACKGROUND_WORKERS", min(4, os.cpu_count() or 1)))
+# Queued + running tasks allowed before new work is refused
+BACKGROUND_MAX_PENDING = int(os.environ.get("BACKGROUND_MAX_PENDING", BACKGROUND_WORKERS * 8))
+
+
+class ExecutorBusy(RuntimeError):
+    pass
+
+
+# A unit of background work. The function receives the task itself so it can
+# report progress and stop early once `cancelled` is set.
+class Task:
+    def __init__(self, name, key):
+        self.name = name
+        self.key = key
+        self.future = None
+        self.progress = 0.0
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        self.future.cancel()
+
+    # Raise CancelledError inside the task if a newer request superseded it
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise CancelledError()
+
+    def set_progress(self, fraction):
+        self.progress = min(1.0, max(0.0, fraction))
+        self.check_cancelled()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def done(self):
+        return self.future.done()
+
+    @property
+    def queue_time(self):
+        return (self.started_at or time.perf_counter()) - self.submitted_at
+
+    @property
+    def run_time(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+
+# Shared, bounded thread pool for CPU-heavy page work (inpainting, PDF
+# parsing, exports). Each (owner, slot) pair holds at most one live task:
+# submitting new work for a slot cancels the previous task, so a rerun
+# triggered by a slider move doesn't wait behind superseded work, while
+# resubmitting the same key reuses the task already running or finished
+# (until the owner releases it after taking its result).
+class BackgroundExecutor:
+    def __init__(self, workers=BACKGROUND_WORKERS, max_pending=BACKGROUND_MAX_PENDING):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page-work")
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._pending = 0
+        self._stats = {}
+
+    def submit(self, owner, slot, key, name, fn):
+        with self._lock:
+            previous = self._slots.get((owner, slot))
+            if previous is not None and previous.key == key and not previous.cancelled:
+                return previous
+            if self._pending >= self.max_pending:
+                registry.inc("uncgai_background_rejected_total", task=name)
+                raise ExecutorBusy("The server is busy with other students' work; please try again shortly.")
+            task = Task(name, key)
+            self._slots[(owner, slot)] = task
+            self._pending += 1
+            registry.set("uncgai_background_pending", self._pending)
+            # Run under the submitter's context so per-session metrics follow the task
+            task.future = self._pool.submit(contextvars.copy_context().run, self._run, task, fn)
+        # Cancelling a future, or adding a callback to one that already finished,
+        # runs _finished in this thread, so neither may happen under self._lock
+        if previous is not None and not previous.done():
+            previous.cancel()
+        task.future.add_done_callback(lambda future: self._finished(task))
+        return task
+
+    def _run(self, task, fn):
+        task.started_at = time.perf_counter()
+        task.check_cancelled()
+        try:
+            return fn(task)
+        finally:
+            task.finished_at = time.perf_counter()
+
+    def _finished(self, task):
+        with self._lock:
+            self._pending -= 1
+            registry.set("uncgai_background_pending", self._pending)
+            stats = self._stats.setdefault(task.name, {
+                "completed": 0, "cancelled": 0, "failed": 0,
+                "queue_time_total": 0.0, "queue_time_max": 0.0,
+                "run_time_total": 0.0, "run_time_max": 0.0,
+            })
+            if task.future.cancelled() or task.cancelled:
+                stats["cancelled"] += 1
+                registry.inc("uncgai_background_tasks_total", task=task.name, outcome="cancelled")
+                return
+            outcome = "failed" if task.future.exception() is not None else "completed"
+            stats[outcome] += 1
+            registry.inc("uncgai_background_tasks_total", task=task.name, outcome=outcome)
+            registry.observe("uncgai_background_queue_seconds", task.queue_time, task=task.name)
+            registry.observe("uncgai_background_run_seconds", task.run_time, task=task.name)
+            stats["queue_time_total"] += task.queue_time
+            stats["queue_time_max"] = max(stats["queue_time_max"], task.queue_time)
+            stats["run_time_total"] += task.run_time
+            stats["run_time_max"] = max(stats["run_time_max"], task.run_time)
+
+    # Drop a finished task whose result its owner has taken, unless newer work
+    # has replaced it in the slot already
+    def release(self, owner, slot, task):
+        with self._lock:
+            if task.done() and self._slots.get((owner, slot)) is task:
+                del self._slots[(owner, slot)]
+
+    # Drop every task of an owner (e.g. an ended session)
+    def forget(self, owner):
+        with self._lock:
+            tasks = [self._slots.pop(k) for k in [k for k in self._slots if k[0] == owner]]
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    def stats(self):
+        with self._lock:
+            summary = {"pending": self._pending, "tasks": {}}
+            for name, stats in self._stats.items():
+                finished = stats["completed"] + stats["failed"]
+                summary["tasks"][name] = {
+                    "completed": stats["completed"],
+                    "cancelled": stats["cancelled"],
+                    "failed": stats["failed"],
+                    "queue_time_avg": stats["queue_time_total"] / finished if finished else 0.0,
+                    "queue_time_max": stats["queue_time_max"],
+                    "run_time_avg": stats["run_time_total"] / finished if finished else 0.0,
+                    "run_time_max": stats["run_time_max"],
+                }
+            return summary
+
+
+executor = BackgroundExecutor()
@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import csv
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from llm_resilience import RetryPolicy, is_retryable
+
+# Requests in flight at once for one batch (the shared rate limiter still applies)
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))
+# Attempts per prompt, and the exponential backoff between them
+BATCH_MAX_ATTEMPTS = int(os.environ.get("BATCH_MAX_ATTEMPTS", 4))
+BATCH_RETRY_BASE_DELAY = float(os.environ.get("BATCH_RETRY_BASE_DELAY", 1.0))
+BATCH_RETRY_MAX_DELAY = float(os.environ.get("BATCH_RETRY_MAX_DELAY", 30.0))
+BATCH_RETRY = RetryPolicy(BATCH_MAX_ATTEMPTS, BATCH_RETRY_BASE_DELAY, BATCH_RETRY_MAX_DELAY)
+
+_NAME_COLUMNS = ("student name", "student", "name")
+_PROMPT_COLUMNS = ("prompt", "student prompt", "question")
+
+
+# One student prompt from the uploaded CSV (index is its row order)
+@dataclass
+class BatchItem:
+    index: int
+    student_name: str
+    prompt: str
+
+
+@dataclass
+class BatchResult:
+    item: BatchItem
+    response: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    latency: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+# Read student prompts from CSV bytes. A "Prompt" column is required and a
+# "Student Name" column is optional (headers are matched case-insensitively).
+def read_prompt_csv(data):
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8-sig")))
+    columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+    prompt_column = next((columns[c] for c in _PROMPT_COLUMNS if c in columns), None)
+    if prompt_column is None:
+        raise ValueError("The CSV needs a 'Prompt' column (and optionally a 'Student Name' column).")
+    name_column = next((columns[c] for c in _NAME_COLUMNS if c in columns), None)
+    items = []
+    for row in reader:
+        prompt = (row.get(prompt_column) or "").strip()
+        if prompt:
+            name = (row.get(name_column) or "").strip() if name_column else ""
+            items.append(BatchItem(len(items), name, prompt))
+    return items
+
+
+# Run `evaluate(item)` (a blocking function returning the response text) for
+# every item, at most `concurrency` at a time on a dedicated thread pool,
+# retrying failures allowed by is_retryable on top of llm_client's own
+# retries, so items outlast longer incidents. `on_result` is called on the
+# event loop thread as each item finishes, in completion order; the returned
+# list is in item order.
+async def evaluate_batch(items, evaluate, concurrency=BATCH_CONCURRENCY, retry=BATCH_RETRY, on_result=None):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-eval")
+
+    async def run(position, item):
+        start = time.perf_counter()
+        for attempt in range(1, retry.max_attempts + 1):
+            try:
+                async with semaphore:
+                    # Keep the caller's context (e.g. the metrics session) in the worker thread
+                    context = contextvars.copy_context()
+                    response = await loop.run_in_executor(pool, context.run, evaluate, item)
+                return position, BatchResult(item, response=response, attempts=attempt,
+                                             latency=time.perf_counter() - start)
+            except Exception as e:
+                if attempt == retry.max_attempts or not is_retryable(e):
+                    return position, BatchResult(item, error=f"{type(e).__name__}: {e}", attempts=attempt,
+                                                 latency=time.perf_counter() - start)
+                # Back off without holding a concurrency slot
+                await asyncio.sleep(retry.delay(attempt, e))
+
+    results = [None] * len(items)
+    tasks = [asyncio.ensure_future(run(position, item)) for position, item in enumerate(items)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            position, result = await finished
+            results[position] = result
+            if on_result is not None:
+                on_result(result)
+    finally:
+        for task in tasks:
+            task.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+# Blocking wrapper around evaluate_batch for callers without an event loop
+def run_batch(items, evaluate, concurrency=BATCH_CONCURRENCY, retry=BATCH_RETRY, on_result=None):
+    return asyncio.run(evaluate_batch(items, evaluate, concurrency, retry, on_result))
@@ -0,0 +1,65 @@
+"""Compare the original PDF extraction path with budgeted and parallel extraction.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf_extraction --pages 60 150 300
+"""
+import argparse
+import statistics
+import time
+from io import BytesIO
+
+import PyPDF2
+
+from benchmarks.fixtures import make_text_pdf
+from pdf_text import extract_text_budgeted, parse_pdf_text
+
+MAX_TEXT_LENGTH = 3000
+
+
+# The extraction + truncation path app.py used before budgeted extraction
+def legacy_extract_and_truncate(data, max_words=MAX_TEXT_LENGTH):
+    pdf_reader = PyPDF2.PdfReader(BytesIO(data))
+    text = "\n".join([page.extract_text() for page in pdf_reader.pages if page.extract_text()])
+    words = text.split()
+    if len(words) > max_words:
+        return " ".join(words[:max_words])
+    return text
+
+
+def _time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[60, 150, 300])
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    variants = {
+        "legacy (2x extract, truncate)": lambda d: legacy_extract_and_truncate(d),
+        "full, serial": lambda d: parse_pdf_text(d),
+        "full, parallel": lambda d: extract_text_budgeted(d, parallel=True),
+        "budgeted, serial": lambda d: extract_text_budgeted(d, max_words=MAX_TEXT_LENGTH, parallel=False),
+        "budgeted, parallel": lambda d: extract_text_budgeted(d, max_words=MAX_TEXT_LENGTH, parallel=True),
+        "budgeted, auto": lambda d: extract_text_budgeted(d, max_words=MAX_TEXT_LENGTH),
+    }
+    print(f"{'pages':>6}  {'variant':<32}{'median s':>10}{'speedup':>10}")
+    for pages in args.pages:
+        data = make_text_pdf(pages, words_per_page=args.words_per_page)
+        baseline = None
+        for name, fn in variants.items():
+            seconds = _time(lambda: fn(data), args.repeat)
+            baseline = baseline or seconds
+            print(f"{pages:>6}  {name:<32}{seconds:>10.3f}{baseline / seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Cold-start benchmark: import cost and first paint of each page.
+
+Every measurement runs in a fresh interpreter, as on a new container:
+
+    python -m benchmarks.bench_startup            # lazy page loading (current app)
+    python -m benchmarks.bench_startup --eager    # import every page up front first
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = [
+    "Prompt Engineering",
+    "Ethics in AI",
+    "Self-Supervised Learning",
+    "Supervised and Unsupervised Learning",
+    "Fine-Tuning LLM Models",
+    "Custom GPT Assistant",
+]
+
+HEAVY_MODULES = ["streamlit", "openai", "pandas", "matplotlib.pyplot", "PyPDF2", "PIL.Image", "cv2", "requests"]
+
+_FIRST_PAINT = """
+import glob, importlib, json, os, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+if {eager!r}:
+    for path in sorted(glob.glob(os.path.join({root!r}, "app_pages", "*.py"))):
+        importlib.import_module("app_pages." + os.path.basename(path)[:-3])
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(os.path.join({root!r}, "app.py"), default_timeout=120)
+at.session_state["page_selector"] = {page!r}
+at.run()
+assert not at.exception, at.exception
+print(json.dumps({{"seconds": time.perf_counter() - start, "modules": len(sys.modules)}}))
+"""
+
+_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start}}))
+"""
+
+
+def _run(code):
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--eager", action="store_true", help="import every page module before the first run")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("Cold import time of heavy dependencies")
+    for module in HEAVY_MODULES:
+        try:
+            seconds = statistics.median(_run(_IMPORT.format(module=module))["seconds"] for _ in range(args.repeat))
+        except subprocess.CalledProcessError:
+            print(f"  {module:<24}not installed")
+            continue
+        print(f"  {module:<24}{seconds * 1000:8.0f} ms")
+
+    print(f"\nCold first paint per page ({'eager' if args.eager else 'lazy'} page loading)")
+    for page in PAGES:
+        runs = [_run(_FIRST_PAINT.format(root=ROOT, eager=args.eager, page=page)) for _ in range(args.repeat)]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        print(f"  {page:<40}{seconds * 1000:8.0f} ms  {runs[0]['modules']:5d} modules loaded")
+
+
+if __name__ == "__main__":
+    main()
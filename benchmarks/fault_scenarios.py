@@ -0,0 +1,213 @@
+"""Fault-injection checks for the OpenAI client's timeouts, retries, hedging, fallback and circuit breaker.
+
+Run from the repository root:
+
+    python -m benchmarks.fault_scenarios
+    python -m benchmarks.fault_scenarios --filter breaker
+
+Every scenario drives llm_client.complete against a local fake server
+(tools/fake_openai.py) that injects one kind of fault: 503 errors, hung
+requests, a slow latency tail, a slow gpt-4 or a full outage. Each prints
+what it measured and whether the client met its expectation; the exit
+status is 1 when any scenario fails.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.fake_openai import FakeOpenAIServer
+
+BASE_LATENCY = 0.05
+
+
+def _messages(i):
+    return [{"role": "user", "content": f"Scenario prompt number {i}"}]
+
+
+# Send `count` distinct requests, `concurrency` at a time, and return
+# (latency, completion or exception) per request
+def _send_many(count, model="gpt-3.5-turbo", concurrency=8, offset=0, **kwargs):
+    from llm_client import complete
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            outcome = complete("sk-faults", _messages(offset + i), model, 0.7, 16, **kwargs)
+        except Exception as e:
+            outcome = e
+        return time.perf_counter() - start, outcome
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(count)))
+
+
+def _p(latencies, q):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _reset(server):
+    from llm_client import reset_timings
+    from llm_resilience import hedge_budget, reset_breakers
+
+    server.error_rate = server.stall_rate = 0.0
+    server.model_delays.clear()
+    reset_timings()
+    reset_breakers()
+    hedge_budget.reset()
+
+
+# 20% of requests fail with 503; retries should hide nearly all of them
+def scenario_transient_errors(server):
+    from metrics import registry
+
+    server.error_rate = 0.2
+    results = _send_many(200)
+    ok = sum(not isinstance(outcome, Exception) for _, outcome in results)
+    retries = registry.counter_total("uncgai_llm_retries_total")
+    return ok >= 196, f"{ok}/200 succeeded, {server.error_count} injected 503s, {retries:g} retries so far"
+
+
+# Every request hangs for 10 s; a 2 s deadline must end each call in about 2 s
+def scenario_deadline(server):
+    server.stall_rate = 1.0
+    server.stall_seconds = 10.0
+    results = _send_many(8, deadline=2.0)
+    slowest = max(latency for latency, _ in results)
+    errors = sorted({type(outcome).__name__ for _, outcome in results if isinstance(outcome, Exception)})
+    failed = sum(isinstance(outcome, Exception) for _, outcome in results)
+    return failed == 8 and slowest < 2.5, f"{failed}/8 failed with {', '.join(errors)}; slowest call {slowest:.2f} s"
+
+
+# 3% of requests take an extra second; hedging at p95 should cut the p99
+def scenario_hedging(server):
+    from llm_resilience import latency_settings
+
+    server.stall_rate = 0.03
+    server.stall_seconds = 1.0
+    _send_many(100, offset=10_000)
+    latency_settings.hedge = False
+    try:
+        unhedged = [latency for latency, _ in _send_many(300, offset=20_000)]
+    finally:
+        latency_settings.hedge = True
+    hedged = [latency for latency, _ in _send_many(300, offset=30_000)]
+    before, after = _p(unhedged, 0.99), _p(hedged, 0.99)
+    return after < before / 2, (f"p99 {before * 1000:.0f} ms without hedging, {after * 1000:.0f} ms with "
+                                f"(p50 {statistics.median(unhedged) * 1000:.0f} -> "
+                                f"{statistics.median(hedged) * 1000:.0f} ms)")
+
+
+# Hedged streams: tokens must still reach on_token on the calling thread
+# (Streamlit placeholders only update from the script thread)
+def scenario_hedged_streaming(server):
+    from llm_client import complete
+    from metrics import registry
+
+    server.stall_rate = 0.1
+    server.stall_seconds = 0.5
+
+    def stream(i):
+        threads = set()
+        caller = threading.current_thread().name
+
+        def on_token(text):
+            threads.add(threading.current_thread().name)
+
+        complete("sk-faults", _messages(i), "gpt-3.5-turbo", 0.7, 16, on_token=on_token)
+        return threads <= {caller}
+
+    before = registry.counter_total("uncgai_llm_hedges_total")
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="student") as pool:
+        on_caller = list(pool.map(stream, range(70_000, 70_200)))
+    hedged = registry.counter_total("uncgai_llm_hedges_total") - before
+    return all(on_caller) and hedged > 0, (
+        f"{sum(on_caller)}/200 streams delivered every token on the calling thread; {hedged:g} hedges sent"
+    )
+
+
+# gpt-4 takes 1.5 s against a 1 s SLO; once that shows in its p95 the
+# client should answer from gpt-3.5-turbo
+def scenario_fallback(server):
+    from llm_resilience import latency_settings
+
+    server.model_delays["gpt-4"] = 1.5
+    slo = latency_settings.slo
+    latency_settings.slo = 1.0
+    try:
+        _send_many(20, model="gpt-4", offset=40_000)
+        results = _send_many(40, model="gpt-4", offset=50_000)
+    finally:
+        latency_settings.slo = slo
+    fallbacks = sum(getattr(outcome, "fallback_from", None) == "gpt-4" for _, outcome in results)
+    p50 = statistics.median(latency for latency, _ in results)
+    return fallbacks == 40 and p50 < 0.5, f"{fallbacks}/40 answered by gpt-3.5-turbo, p50 {p50 * 1000:.0f} ms"
+
+
+# A full outage opens the circuit, after which calls fail fast without
+# reaching the server; once it recovers a probe closes the circuit again
+def scenario_breaker(server):
+    from llm_resilience import breaker_for
+
+    breaker = breaker_for("gpt-3.5-turbo")
+    breaker.reset_seconds = 1.0
+    server.error_rate = 1.0
+    _send_many(8, offset=60_000)
+    opened = breaker.state == "open"
+    before = server.request_count
+    results = _send_many(50, offset=61_000)
+    fast = max(latency for latency, _ in results)
+    reached = server.request_count - before
+    server.error_rate = 0.0
+    time.sleep(1.1)
+    recovered = _send_many(5, offset=62_000, concurrency=1)
+    closed = breaker.state == "closed" and not any(isinstance(outcome, Exception) for _, outcome in recovered)
+    return opened and reached == 0 and fast < 0.05 and closed, (
+        f"circuit {'opened' if opened else 'stayed closed'}; 50 calls while open reached the server "
+        f"{reached} times, slowest {fast * 1000:.1f} ms; {'closed' if closed else 'still open'} after recovery"
+    )
+
+
+SCENARIOS = {
+    "transient_errors": scenario_transient_errors,
+    "deadline": scenario_deadline,
+    "hedging": scenario_hedging,
+    "hedged_streaming": scenario_hedged_streaming,
+    "fallback": scenario_fallback,
+    "breaker": scenario_breaker,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", help="only run scenarios whose name matches this regular expression")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(first_token_delay=BASE_LATENCY, seed=0) as server:
+        # Set before the app modules are imported, which read them once
+        os.environ["OPENAI_API_BASE"] = server.api_base
+        os.environ.setdefault("OPENAI_RPM", "1000000")
+        os.environ.setdefault("OPENAI_TPM", "1000000000")
+        os.environ.setdefault("LLM_CACHE", "0")
+        os.environ.setdefault("LLM_RETRY_BASE_DELAY", "0.05")
+
+        failures = 0
+        for name, scenario in SCENARIOS.items():
+            if args.filter and not re.search(args.filter, name):
+                continue
+            _reset(server)
+            start = time.perf_counter()
+            passed, detail = scenario(server)
+            failures += not passed
+            print(f"{'PASS' if passed else 'FAIL'}  {name:<18}{time.perf_counter() - start:>6.1f} s  {detail}",
+                  flush=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
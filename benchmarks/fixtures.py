@@ -0,0 +1,87 @@
+import random
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+_FILLER_WORDS = (
+    "warranty coverage product defect repair replacement manufacturer period "
+    "purchase receipt claim service damage excluded limited parts labor "
+    "customer return authorized dealer normal use accident water battery"
+).split()
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+# Build a simple text-only PDF with the given number of pages.
+# Written by hand so benchmarks need nothing beyond the app's own requirements.
+def make_text_pdf(num_pages, words_per_page=400, words_per_line=12, seed=0):
+    rng = random.Random(seed)
+    objects = []
+    page_ids = []
+    font_id = 3
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(None)  # Pages tree, filled in once the kids are known
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for page_number in range(num_pages):
+        words = [rng.choice(_FILLER_WORDS) for _ in range(words_per_page)]
+        lines = [" ".join(words[i:i + words_per_line]) for i in range(0, len(words), words_per_line)]
+        ops = [f"BT /F1 10 Tf 12 TL 40 800 Td (Page {page_number + 1}) Tj T*"]
+        ops.extend(f"({_pdf_escape(line)}) Tj T*" for line in lines)
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font_id, content_id)
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, num_pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(out)
+
+
+# Words of filler text, e.g. for truncation and export benchmarks
+def make_words(num_words, seed=0):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(_FILLER_WORDS) for _ in range(num_words))
+
+
+# Interaction log rows shaped like the ones save_interaction() records
+def make_interactions(num_rows, prompt_words=40, response_words=150, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "Timestamp": f"2025-01-{1 + i % 28:02d} 12:{i % 60:02d}:00",
+            "Student Name": f"Student {i % 40}",
+            "Prompt": " ".join(rng.choice(_FILLER_WORDS) for _ in range(prompt_words)),
+            "AI Response": " ".join(rng.choice(_FILLER_WORDS) for _ in range(response_words)),
+        }
+        for i in range(num_rows)
+    ]
+
+
+# JPEG of a smooth gradient with noise, roughly as hard to inpaint as a photo
+def make_photo_jpeg(width, height, seed=0, quality=90):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([x / width * 255, y / height * 255, (x + y) / (width + height) * 255], axis=-1)
+    noise = rng.normal(0, 12, size=base.shape)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    output = BytesIO()
+    Image.fromarray(pixels).save(output, format="JPEG", quality=quality)
+    return output.getvalue()
@@ -0,0 +1,110 @@
+"""Checks for the batched interaction log against the stub Google Sheets worksheet.
+
+Run from the repository root:
+
+    python -m benchmarks.interaction_log_checks
+    python -m benchmarks.interaction_log_checks --filter close
+
+Every check builds the "gsheets" backend through make_backend with
+GSHEETS_STUB set, so rows go to an in-memory tools/stub_worksheet.py
+worksheet that can be slowed down or made to fail. Each prints what it
+measured and whether the sink met its expectation; the exit status is 1
+when any check fails.
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+
+ROWS = 500
+
+
+def _sink(latency=0.0, fail_every=0, **kwargs):
+    import interaction_log
+
+    interaction_log.GSHEETS_STUB_LATENCY = latency
+    interaction_log.GSHEETS_STUB_FAIL_EVERY = fail_every
+    sink = interaction_log.InteractionSink(interaction_log.make_backend("gsheets"), **kwargs)
+    return sink, sink.backend.worksheet
+
+
+def _record(sink, count):
+    started = []
+    for i in range(count):
+        start = time.perf_counter()
+        sink.record({"Timestamp": f"2026-09-01 10:{i // 60 % 60:02d}:{i % 60:02d}", "Student Name": f"Student {i}",
+                     "Prompt": f"Prompt {i}", "AI Response": f"Response {i}", "Session": "checks"})
+        started.append(time.perf_counter() - start)
+    return started
+
+
+# Every third append fails; records still queued at close() must all be written
+def check_flaky_sheet_close():
+    sink, worksheet = _sink(fail_every=3, batch_size=20)
+    _record(sink, ROWS)
+    sink.close()
+    stats = sink.stats()
+    return len(worksheet.rows) == ROWS and stats["dropped"] == 0, (
+        f"{len(worksheet.rows)}/{ROWS} rows written, {stats['write_errors']} failed appends, "
+        f"{stats['dropped']} dropped"
+    )
+
+
+# The sheet is down at shutdown; every row that was not written is counted as dropped
+def check_outage_at_close():
+    sink, worksheet = _sink(fail_every=1, batch_size=20)
+    _record(sink, ROWS)
+    start = time.perf_counter()
+    sink.close()
+    elapsed = time.perf_counter() - start
+    stats = sink.stats()
+    return len(worksheet.rows) + stats["dropped"] == ROWS and elapsed < 10, (
+        f"{len(worksheet.rows)} written + {stats['dropped']} dropped of {ROWS}; close() took {elapsed:.1f} s"
+    )
+
+
+# A slow sheet (50 ms per append) must not slow down save_interaction
+def check_slow_sheet_off_request_path():
+    sink, worksheet = _sink(latency=0.05)
+    latencies = sorted(_record(sink, ROWS))
+    sink.flush()
+    sink.close()
+    slowest = latencies[-1]
+    return len(worksheet.rows) == ROWS and slowest < 0.01, (
+        f"slowest record() {slowest * 1000:.2f} ms; {len(worksheet.rows)}/{ROWS} rows in {worksheet.calls} appends"
+    )
+
+
+CHECKS = {
+    "flaky_sheet_close": check_flaky_sheet_close,
+    "outage_at_close": check_outage_at_close,
+    "slow_sheet": check_slow_sheet_off_request_path,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", help="only run checks whose name matches this regular expression")
+    args = parser.parse_args()
+
+    # Set before interaction_log is imported, which reads them once
+    os.environ["GSHEETS_STUB"] = "1"
+    os.environ.setdefault("INTERACTION_LOG_FLUSH_INTERVAL", "0.05")
+    # Failed appends are logged with tracebacks; only the summary lines matter here
+    logging.disable(logging.CRITICAL)
+
+    failures = 0
+    for name, check in CHECKS.items():
+        if args.filter and not re.search(args.filter, name):
+            continue
+        start = time.perf_counter()
+        passed, detail = check()
+        failures += not passed
+        print(f"{'PASS' if passed else 'FAIL'}  {name:<20}{time.perf_counter() - start:>6.1f} s  {detail}", flush=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
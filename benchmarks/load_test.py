@@ -0,0 +1,363 @@
+"""Simulate a classroom of concurrent students against the real app pages.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --students 20 --duration 120
+    python -m benchmarks.load_test --students 10 --think-time 0 --rate-limit-rate 0.1 --json load.json
+
+Every simulated student is its own Streamlit session (streamlit.testing
+AppTest) running app.py in this process, so sessions share the process-wide
+caches, background executor and rate limiter exactly as on a real pod. Each
+one loops over the pages in a random order: uploading PDFs and images,
+clicking Generate, chatting, re-clustering and downloading exports, with a
+random think time between interactions. OpenAI calls go to the local fake
+server, which can add latency and answer a fraction of requests with 429.
+
+The report gives p50/p95/p99 rerun latency per interaction, throughput,
+resident memory growth per session and CPU saturation. PDF extraction pool
+workers run in separate processes and are not included in the CPU figures.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+
+from benchmarks.fixtures import make_photo_jpeg, make_text_pdf, make_words
+from tools.fake_openai import FakeOpenAIServer
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Not Linux: fall back to the peak, which is all getrusage reports
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+# Samples resident memory and CPU use of this process in the background
+class ResourceSampler:
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-test-sampler", daemon=True)
+
+    def start(self):
+        self.samples.append((time.monotonic(), _rss_bytes(), _cpu_seconds()))
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.samples.append((time.monotonic(), _rss_bytes(), _cpu_seconds()))
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.samples.append((time.monotonic(), _rss_bytes(), _cpu_seconds()))
+
+
+# Shared upload fixtures: a few distinct handouts and photos, as in a class
+# where most students upload the same files
+class Fixtures:
+    def __init__(self, distinct=3):
+        self.pdfs = [make_text_pdf(pages, seed=i) for i, pages in enumerate((20, 40, 80)[:distinct])]
+        self.images = [make_photo_jpeg(2000, 1500, seed=i) for i in range(distinct)]
+        self.prompts = [make_words(30, seed=i) for i in range(20)]
+
+
+def _widget(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"No widget labelled {label!r} on the page")
+
+
+# One simulated student: an AppTest session driven through the pages
+class Student:
+    def __init__(self, number, fixtures, think_time, timeout, seed, record):
+        self.name = f"Student {number}"
+        self.fixtures = fixtures
+        self.think_time = think_time
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.record = record
+        self.at = self._new_session()
+
+    def _new_session(self):
+        from streamlit.testing.v1 import AppTest
+
+        return AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+
+    def run(self, deadline):
+        self._rerun("open", "first_paint", self.at.run, think=False)
+        actions = list(ACTIONS)
+        self.rng.shuffle(actions)
+        for action in itertools.cycle(actions):
+            if time.monotonic() >= deadline:
+                return
+            try:
+                action(self)
+            except Exception as e:
+                # e.g. a rerun timed out or the page layout was not as expected
+                self.record({"action": action.__name__, "step": "failed", "latency": 0.0,
+                             "ok": False, "error": f"{type(e).__name__}: {e}"})
+                # Reload the app in a fresh session, as a student would
+                self.at = self._new_session()
+                self._rerun("open", "reload", self.at.run)
+
+    def _think(self):
+        if self.think_time:
+            time.sleep(self.rng.uniform(0.5, 1.5) * self.think_time)
+
+    # Time one interaction (a rerun or a download) and record its outcome
+    def _rerun(self, action, step, fn, think=True):
+        if think:
+            self._think()
+        start = time.perf_counter()
+        fn()
+        latency = time.perf_counter() - start
+        errors = [element.value for element in self.at.exception] + [element.value for element in self.at.error]
+        self.record({"action": action, "step": step, "latency": latency,
+                     "ok": not errors, "error": errors[0] if errors else None})
+
+    def _select_page(self, action, page):
+        self._rerun(action, "open_page", self.at.selectbox(key="page_selector").select(page).run)
+
+    def _download(self, action):
+        from interaction_export import ExportMemo
+        from session_store import session_store
+
+        state = self.at.session_state
+        if not state.interactions_version:
+            return
+        # The callable st.download_button runs when the button is clicked
+        interactions = session_store.get(state.session_token, "interactions", list)
+        export_memo = session_store.get(state.session_token, "export_memo", ExportMemo, cache=True)
+        build = export_memo.lazy(interactions, len(interactions), state.interactions_version, "Excel")
+        self._rerun(action, "download", build)
+
+    def prompt_engineering(self):
+        at = self.at
+        self._select_page("prompt_engineering", "Prompt Engineering")
+        _widget(at.text_input, "Enter your OpenAI API Key:").input("sk-load-test")
+        _widget(at.text_input, "Enter your name:").input(self.name)
+        pdf = self.rng.choice(self.fixtures.pdfs)
+        uploader = _widget(at.file_uploader, "Upload a PDF file")
+        self._rerun("prompt_engineering", "upload_pdf",
+                    lambda: uploader.set_value(("handout.pdf", pdf, "application/pdf")).run())
+        _widget(at.text_area, "Write your prompt here:").input(self.rng.choice(self.fixtures.prompts))
+        self._rerun("prompt_engineering", "generate", _widget(at.button, "Generate AI Response").click().run)
+        self._download("prompt_engineering")
+
+    def self_supervised(self):
+        at = self.at
+        self._select_page("self_supervised", "Self-Supervised Learning")
+        image = self.rng.choice(self.fixtures.images)
+        uploader = _widget(at.file_uploader, "Upload an Image (JPG or PNG)")
+        self._rerun("self_supervised", "upload_image",
+                    lambda: uploader.set_value(("photo.jpg", image, "image/jpeg")).run())
+        self._rerun("self_supervised", "move_mask", _widget(at.button, "Move Mask").click().run)
+        self._rerun("self_supervised", "inpaint", _widget(at.button, "Regenerate Masked Area").click().run)
+
+    def custom_gpt(self):
+        at = self.at
+        self._select_page("custom_gpt", "Custom GPT Assistant")
+        _widget(at.text_input, "Enter OpenAI API Key:").input("sk-load-test")
+        for _ in range(2):
+            at.text_area(key="user_input").input(self.rng.choice(self.fixtures.prompts))
+            self._rerun("custom_gpt", "send", _widget(at.button, "Send").click().run)
+
+    def fine_tuning(self):
+        at = self.at
+        self._select_page("fine_tuning", "Fine-Tuning LLM Models")
+        _widget(at.text_input, "Enter your OpenAI API Key:").input("sk-load-test")
+        _widget(at.text_input, "Enter your name:").input(self.name)
+        _widget(at.text_input, "Enter a sample review:").input(self.rng.choice(self.fixtures.prompts))
+        self._rerun("fine_tuning", "generate", _widget(at.button, "Generate Response").click().run)
+        self._download("fine_tuning")
+
+    def clustering(self):
+        at = self.at
+        self._select_page("clustering", "Supervised and Unsupervised Learning")
+        self._rerun("clustering", "synthetic_data",
+                    _widget(at.radio, "Choose a dataset:").set_value("Synthetic clusters").run)
+        slider = _widget(at.slider, "Number of clusters (k):")
+        self._rerun("clustering", "change_k", slider.set_value(self.rng.randint(2, 10)).run)
+
+
+ACTIONS = (Student.prompt_engineering, Student.self_supervised, Student.custom_gpt,
+           Student.fine_tuning, Student.clustering)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def _latency_row(latencies):
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+def summarize(records, samples, elapsed, students, server):
+    reruns = [r for r in records if r["step"] != "failed"]
+    by_step = {}
+    for record in reruns:
+        by_step.setdefault(f"{record['action']}:{record['step']}", []).append(record["latency"])
+    failures = [r for r in records if not r["ok"]]
+    rate_limited = sum(1 for r in failures if r["error"] and "rate limit" in r["error"].lower())
+
+    start_rss, peak_rss, end_rss = samples[0][1], max(s[1] for s in samples), samples[-1][1]
+    utilization = []
+    for (t0, _, cpu0), (t1, _, cpu1) in zip(samples, samples[1:]):
+        if t1 > t0:
+            utilization.append((cpu1 - cpu0) / (t1 - t0))
+    cores = os.cpu_count() or 1
+    return {
+        "students": students,
+        "elapsed": elapsed,
+        "interactions": len(reruns),
+        "throughput": len(reruns) / elapsed if elapsed else 0.0,
+        "llm_requests": server.request_count,
+        "llm_rate_limited": server.rate_limited_count,
+        "failed": len(failures),
+        "failed_rate_limited": rate_limited,
+        "errors": sorted({r["error"] for r in failures if r["error"]})[:10],
+        "latency": {"all": _latency_row(r["latency"] for r in reruns),
+                    **{step: _latency_row(values) for step, values in sorted(by_step.items())}},
+        "memory": {
+            "start_rss": start_rss,
+            "peak_rss": peak_rss,
+            "end_rss": end_rss,
+            "growth_per_session": (end_rss - start_rss) / students if students else 0.0,
+        },
+        "cpu": {
+            "cores": cores,
+            "mean_utilization": statistics.fmean(utilization) / cores if utilization else 0.0,
+            "peak_utilization": max(utilization) / cores if utilization else 0.0,
+            "saturated_fraction": (sum(u / cores > 0.9 for u in utilization) / len(utilization)
+                                   if utilization else 0.0),
+        },
+    }
+
+
+def print_report(summary, args):
+    mb = 1024 * 1024
+    print(f"\nStudents: {summary['students']}   Duration: {summary['elapsed']:.1f} s   "
+          f"Think time: {args.think_time:g} s")
+    print(f"Interactions: {summary['interactions']} ({summary['throughput']:.2f}/s)   "
+          f"LLM requests: {summary['llm_requests']} "
+          f"({summary['llm_requests'] / summary['elapsed']:.2f}/s, "
+          f"{summary['llm_rate_limited']} answered 429 by the stub)")
+    print(f"Failed interactions: {summary['failed']} ({summary['failed_rate_limited']} rate-limit errors shown)")
+    for error in summary["errors"]:
+        print(f"  {error[:110]}")
+    print(f"\n{'Latency (s)':<40}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name, row in summary["latency"].items():
+        print(f"{name:<40}{row['count']:>7}{row['p50']:>9.3f}{row['p95']:>9.3f}{row['p99']:>9.3f}{row['max']:>9.3f}")
+    memory, cpu = summary["memory"], summary["cpu"]
+    print(f"\nMemory: {memory['start_rss'] / mb:.0f} MB RSS at start, {memory['peak_rss'] / mb:.0f} MB peak, "
+          f"{memory['end_rss'] / mb:.0f} MB at end ({memory['growth_per_session'] / mb:+.1f} MB per session)")
+    print(f"CPU: {cpu['mean_utilization']:.0%} mean, {cpu['peak_utilization']:.0%} peak of "
+          f"{cpu['cores']} core(s); above 90% for {cpu['saturated_fraction']:.0%} of the run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of simulated class time")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="seconds over which students join")
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean pause between interactions")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds before a rerun counts as hung")
+    parser.add_argument("--first-token-delay", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--latency-jitter", type=float, default=0.5)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of LLM requests answered 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-warmup", action="store_true", help="include first-use imports in the measurements")
+    parser.add_argument("--json", metavar="PATH", help="also write the summary as JSON")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(
+        first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+        latency_jitter=args.latency_jitter, rate_limit_rate=args.rate_limit_rate, seed=args.seed,
+    ).start()
+    # Set before the app modules are imported, which read them once
+    os.environ["OPENAI_API_BASE"] = server.api_base
+    os.environ.setdefault("INTERACTION_LOG_BACKEND", "none")
+
+    fixtures = Fixtures()
+    if not args.no_warmup:
+        # One pass over every page so module imports and first-use caches
+        # aren't attributed to the measured sessions
+        print("Warming up...", flush=True)
+        warmup = Student(-1, fixtures, 0, args.timeout, args.seed, lambda record: None)
+        warmup.at.run()
+        for action in ACTIONS:
+            action(warmup)
+        server.request_count = server.rate_limited_count = 0
+
+    records = []
+    records_lock = threading.Lock()
+
+    def record(entry):
+        with records_lock:
+            records.append(entry)
+
+    print(f"Running {args.students} students for {args.duration:g} s...", flush=True)
+    sampler = ResourceSampler().start()
+    start = time.monotonic()
+    deadline = start + args.duration
+
+    def run_student(number):
+        time.sleep(args.ramp_up * number / max(1, args.students))
+        try:
+            Student(number, fixtures, args.think_time, args.timeout, args.seed + number, record).run(deadline)
+        except Exception as e:
+            record({"action": "open", "step": "failed", "latency": 0.0, "ok": False,
+                    "error": f"{type(e).__name__}: {e}"})
+
+    threads = [threading.Thread(target=run_student, args=(n,), name=f"student-{n}") for n in range(args.students)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    samples = sampler.stop()
+    server.stop()
+
+    summary = summarize(records, samples, elapsed, args.students, server)
+    print_report(summary, args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"arguments": vars(args), **summary}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""Micro-benchmarks for the app's hot paths, saved and compared as JSON baselines.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --save benchmarks/baselines/fall.json
+    python -m benchmarks.suite --compare benchmarks/baselines/fall.json
+    python -m benchmarks.suite --filter "excel|inpaint" --repeat 3
+    python -m benchmarks.suite --list
+
+OpenAI calls go to a local fake server (tools/fake_openai.py), so the LLM
+cases measure the app's own request path, not the network. With --compare,
+the exit status is 1 when any case is slower than the baseline by more than
+--threshold.
+"""
+import argparse
+import datetime
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Callable, Optional
+
+from benchmarks.fixtures import make_interactions, make_photo_jpeg, make_text_pdf, make_words
+from tools.fake_openai import FakeOpenAIServer
+
+BASELINE_VERSION = 1
+# Mask side as a percentage of the image side, as on the Self-Supervised page
+MASK_PERCENTAGE = 40
+
+
+# One benchmark: `run` is timed, `before_each` (e.g. clearing a cache) is not
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], object]
+    before_each: Optional[Callable[[], object]] = None
+
+
+def _text_cases():
+    from app_pages.prompt_engineering import MAX_TEXT_LENGTH, truncate_text
+
+    for words in (10_000, 100_000, 1_000_000):
+        text = make_words(words)
+        yield Case(f"truncate_text/words={words}", lambda text=text: truncate_text(text, MAX_TEXT_LENGTH))
+
+
+def _pdf_cases():
+    from app_pages.prompt_engineering import MAX_TEXT_LENGTH, extract_text_from_pdf
+    from pdf_text import extraction_cache
+
+    for pages in (10, 60, 200):
+        data = make_text_pdf(pages)
+        # Cleared before every run so each one parses the document
+        yield Case(f"extract_text_from_pdf/pages={pages}/preview",
+                   lambda data=data: extract_text_from_pdf(BytesIO(data), max_words=MAX_TEXT_LENGTH),
+                   before_each=extraction_cache.clear)
+        yield Case(f"extract_text_from_pdf/pages={pages}/full",
+                   lambda data=data: extract_text_from_pdf(BytesIO(data)),
+                   before_each=extraction_cache.clear)
+
+
+def _image_cases():
+    from image_pipeline import _image_cache, ingest_image, inpaint_image, mask_image
+
+    photo = make_photo_jpeg(4000, 3000)
+    yield Case("ingest_image/4000x3000", lambda: ingest_image(photo), before_each=_image_cache.clear)
+
+    seeds = itertools.count()
+    for width, height in ((512, 384), (1024, 768), (1600, 1200)):
+        image = ingest_image(make_photo_jpeg(width, height, seed=1))
+        size = f"{width}x{height}"
+        # A new seed per run, as after "Move Mask", so the mask cache never hits
+        yield Case(f"mask_image/{size}", lambda image=image: mask_image(image, MASK_PERCENTAGE, next(seeds)))
+        _, mask = mask_image(image, MASK_PERCENTAGE, 0)
+        for mode in ("pyramid", "direct"):
+            yield Case(f"inpaint/{size}/{mode}",
+                       lambda image=image, mask=mask, mode=mode: inpaint_image(image.pixels, mask, mode=mode))
+
+
+def _export_cases():
+    from app_pages.common import generate_excel
+
+    for rows in (10, 1_000, 10_000, 100_000):
+        interactions = make_interactions(rows)
+        yield Case(f"generate_excel/rows={rows}", lambda interactions=interactions: generate_excel(interactions))
+
+
+def _prompt_cases():
+    from app_pages.fine_tuning import RESTAURANT_EXAMPLES, build_few_shot_prompt
+
+    for count in (10, 100, 1_000):
+        examples = list(itertools.islice(itertools.cycle(RESTAURANT_EXAMPLES), count))
+        yield Case(f"build_few_shot_prompt/examples={count}",
+                   lambda examples=examples: build_few_shot_prompt(examples, "The soup was cold."))
+
+
+def _example_cases():
+    from example_store import ExampleStore
+
+    rng = random.Random(0)
+    for count in (1_000, 10_000, 100_000):
+        examples = [{"review": make_words(20, seed=rng.randrange(1 << 30)), "response": make_words(25, seed=i)}
+                    for i in range(count)]
+        if count <= 10_000:
+            yield Case(f"ExampleStore/examples={count}/build", lambda examples=examples: ExampleStore(examples))
+        store = ExampleStore(examples)
+        yield Case(f"ExampleStore/examples={count}/select",
+                   lambda store=store: store.select("The soup was cold and the waiter was rude."))
+
+
+def _llm_cases():
+    from app_pages.custom_gpt import fetch_ai_response
+    from app_pages.prompt_engineering import generate_response
+
+    prompt = make_words(300)
+    yield Case("generate_response/fake-server", lambda: generate_response("sk-bench", prompt))
+    yield Case("generate_response/fake-server/streamed",
+               lambda: generate_response("sk-bench", prompt, on_token=lambda text: None))
+    history = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": make_words(60, seed=i)}
+        for i in range(20)
+    ]
+    yield Case("fetch_ai_response/fake-server/20-turn-history",
+               lambda: fetch_ai_response("sk-bench", "Summarize our chat.", "gpt-4", 0.7, 200,
+                                         system="You are a helpful tutor.", history=history))
+
+
+CASE_GROUPS = (_text_cases, _pdf_cases, _image_cases, _export_cases, _prompt_cases, _example_cases,
+               _llm_cases)
+
+
+def iter_cases(pattern=None):
+    for group in CASE_GROUPS:
+        for case in group():
+            if pattern is None or re.search(pattern, case.name):
+                yield case
+
+
+# Time a case like timeit does (garbage collector paused): fast cases loop
+# until one sample takes at least `min_time`, and the per-call median, min,
+# mean and standard deviation over `repeat` samples are reported.
+def measure(case, repeat=5, min_time=0.2):
+    if case.before_each is not None:
+        case.before_each()
+    start = time.perf_counter()
+    case.run()
+    warmup = time.perf_counter() - start
+    number = 1
+    if case.before_each is None and warmup < min_time:
+        number = max(1, int(min_time / max(warmup, 1e-7)))
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    try:
+        for _ in range(repeat):
+            if case.before_each is not None:
+                case.before_each()
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter()
+            for _ in range(number):
+                case.run()
+            samples.append((time.perf_counter() - start) / number)
+            if gc_was_enabled:
+                gc.enable()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+# Per-case change of the median against a baseline. A case is a regression
+# (or improvement) when it moved by more than `threshold` as a fraction.
+def compare(baseline, results, threshold):
+    rows = []
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            rows.append((name, None, current["median"], None, "new"))
+            continue
+        change = current["median"] / previous["median"] - 1
+        if change > threshold:
+            status = "REGRESSION"
+        elif change < -threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, previous["median"], current["median"], change, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", help="only run cases whose name matches this regular expression")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per sample for fast cases")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown before failing (0.15 = 15%%)")
+    parser.add_argument("--list", action="store_true", help="list case names and exit")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    with FakeOpenAIServer() as server:
+        # Set before the app modules are imported, which read them once
+        os.environ["OPENAI_API_BASE"] = server.api_base
+        os.environ.setdefault("OPENAI_RPM", "1000000")
+        os.environ.setdefault("OPENAI_TPM", "1000000000")
+        os.environ.setdefault("LLM_CACHE", "0")
+        os.environ.setdefault("INTERACTION_LOG_BACKEND", "none")
+
+        if args.list:
+            for case in iter_cases(args.filter):
+                print(case.name)
+            return 0
+
+        results = {}
+        for case in iter_cases(args.filter):
+            results[case.name] = measure(case, args.repeat, args.min_time)
+            stats = results[case.name]
+            print(f"{case.name:<52}{_format_seconds(stats['median']):>12}  ±{_format_seconds(stats['stdev'])}",
+                  flush=True)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"version": BASELINE_VERSION, "environment": environment(), "results": results}, f, indent=2)
+        print(f"\nSaved {len(results)} results to {args.save}")
+
+    if baseline is None:
+        return 0
+    current_env = environment()
+    for key in ("machine", "cpu_count", "python"):
+        if baseline["environment"].get(key) != current_env[key]:
+            print(f"\nNote: baseline was recorded with {key}={baseline['environment'].get(key)}, "
+                  f"this run has {key}={current_env[key]}")
+    print(f"\nCompared with {args.compare} (revision {baseline['environment'].get('revision')})")
+    regressions = 0
+    for name, before, after, change, status in compare(baseline, results, args.threshold):
+        before_text = _format_seconds(before) if before is not None else "-"
+        change_text = f"{change:+.1%}" if change is not None else ""
+        print(f"{name:<52}{before_text:>12}{_format_seconds(after):>12}{change_text:>9}  {status}")
+        regressions += status == "REGRESSION"
+    if regressions:
+        print(f"\n{regressions} case(s) slower than the baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
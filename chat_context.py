@@ -0,0 +1,94 @@
+import re
+from dataclasses import dataclass
+
+from token_budget import estimate_tokens
+
+# Default prompt budget for a chat request (system + summary + turns + question)
+CHAT_CONTEXT_TOKENS = 3000
+RECENT_TURNS = 6
+SUMMARY_TOKENS = 400
+# Per-message overhead of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADING = "\n\nSummary of the earlier conversation:\n"
+
+_FIRST_SENTENCE = re.compile(r"(.+?[.!?])(\s|$)", re.S)
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+# One-line gist of a message: its first sentence, capped at `max_words`
+def _gist(text, max_words=25):
+    text = " ".join(text.split())
+    match = _FIRST_SENTENCE.match(text)
+    sentence = match.group(1) if match else text
+    words = sentence.split()
+    if len(words) > max_words:
+        sentence = " ".join(words[:max_words]) + "..."
+    return sentence
+
+
+# Request context built for one turn
+@dataclass
+class ContextWindow:
+    system: str
+    history: list
+    prompt_tokens: int
+    summarized_messages: int
+
+
+# Builds token-budgeted chat requests from a growing conversation.
+# Each request carries the system prompt, a compact extractive summary of
+# older turns, and as many recent turns as fit the budget. The summary is
+# extended incrementally as turns age out of the window, so older messages
+# are summarized once rather than on every turn.
+class ConversationContext:
+    def __init__(self, max_tokens=CHAT_CONTEXT_TOKENS, recent_turns=RECENT_TURNS, summary_tokens=SUMMARY_TOKENS):
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.summary_tokens = summary_tokens
+        self._summary_lines = []
+        self._summarized = 0
+
+    def _extend_summary(self, history, upto):
+        for message in history[self._summarized:upto]:
+            speaker = "Student" if message["role"] == "user" else "Tutor"
+            self._summary_lines.append(f"- {speaker}: {_gist(message['content'])}")
+        self._summarized = max(self._summarized, upto)
+        # Keep the most recent gists that fit the summary budget
+        while self._summary_lines and estimate_tokens("\n".join(self._summary_lines)) > self.summary_tokens:
+            self._summary_lines.pop(0)
+
+    # history holds the user/assistant messages before `user_input`. The
+    # summary and recent turns share what the system prompt and question
+    # leave of max_tokens.
+    def build(self, system, history, user_input):
+        fixed = estimate_tokens(system) + MESSAGE_OVERHEAD_TOKENS * 2 + estimate_tokens(user_input)
+        summary_tokens = min(self.summary_tokens, max(0, self.max_tokens - fixed))
+        available = self.max_tokens - fixed - summary_tokens
+        start = len(history)
+        used = 0
+        while start > 0 and len(history) - start < self.recent_turns * 2:
+            cost = message_tokens(history[start - 1])
+            if used + cost > available:
+                break
+            used += cost
+            start -= 1
+        # Never drop a message without summarizing it first
+        if start > self._summarized:
+            self._extend_summary(history, start)
+        else:
+            start = max(start, self._summarized)
+        window = [{"role": m["role"], "content": m["content"]} for m in history[start:]]
+        # The most recent gists that fit this turn's share of the budget
+        lines = list(self._summary_lines)
+        while lines and estimate_tokens(SUMMARY_HEADING + "\n".join(lines)) > summary_tokens:
+            lines.pop(0)
+        if lines:
+            system = f"{system}{SUMMARY_HEADING}" + "\n".join(lines)
+        prompt_tokens = (
+            estimate_tokens(system) + estimate_tokens(user_input) + MESSAGE_OVERHEAD_TOKENS * 2
+            + sum(message_tokens(m) for m in window)
+        )
+        return ContextWindow(system, window, prompt_tokens, self._summarized)
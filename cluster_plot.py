@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgba_array
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+
+# Above this many points the plot switches to a binned density rendering
+SCATTER_MAX_POINTS = 20000
+DENSITY_BINS = 200
+PLOT_CACHE_SIZE = 128
+FIGSIZE = (8, 6)
+DPI = 100
+PALETTE = to_rgba_array([f"C{i}" for i in range(10)])
+
+_plot_cache = OrderedDict()
+_plot_lock = threading.Lock()
+
+
+def cluster_colors(clusters):
+    return {cluster: PALETTE[i % len(PALETTE)] for i, cluster in enumerate(clusters)}
+
+
+# Scatter every point in one call with per-point RGBA (highlighted cluster opaque)
+def _draw_scatter(ax, x, y, labels, clusters, selected):
+    colors = cluster_colors(clusters)
+    codes = np.searchsorted(clusters, labels)
+    rgba = np.asarray([colors[c] for c in clusters])[codes]
+    rgba[:, 3] = np.where(labels == selected, 1.0, 0.3)
+    ax.scatter(x, y, c=rgba)
+
+
+# Aggregate points into a 2D grid: each cell takes the colour of its most
+# common cluster, with opacity scaled by density (dimmed unless highlighted)
+def _draw_density(ax, x, y, labels, clusters, selected, bins=DENSITY_BINS):
+    colors = cluster_colors(clusters)
+    x_edges = np.linspace(x.min(), x.max(), bins + 1)
+    y_edges = np.linspace(y.min(), y.max(), bins + 1)
+    counts = np.stack([
+        np.histogram2d(x[labels == c], y[labels == c], bins=(x_edges, y_edges))[0] for c in clusters
+    ])
+    total = counts.sum(axis=0)
+    dominant = counts.argmax(axis=0)
+    image = np.asarray([colors[c] for c in clusters])[dominant]
+    density = np.log1p(total) / np.log1p(total.max() or 1)
+    highlight = np.asarray(clusters)[dominant] == selected
+    image[..., 3] = np.where(total > 0, density * np.where(highlight, 1.0, 0.3), 0.0)
+    ax.imshow(
+        image.transpose(1, 0, 2), origin="lower", aspect="auto", interpolation="nearest",
+        extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]),
+    )
+
+
+def _render(x, y, labels, selected, xlabel, ylabel, mode):
+    clusters = np.unique(labels)
+    # A bare Figure (not pyplot) is freed as soon as it goes out of scope
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if mode == "density":
+        _draw_density(ax, x, y, labels, clusters, selected)
+    else:
+        _draw_scatter(ax, x, y, labels, clusters, selected)
+    colors = cluster_colors(clusters)
+    handles = [
+        Line2D([], [], marker="o", linestyle="", color=colors[c], alpha=1.0 if c == selected else 0.3,
+               label=f"Cluster {c}")
+        for c in clusters
+    ]
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.legend(handles=handles)
+    output = BytesIO()
+    fig.savefig(output, format="png")
+    return output.getvalue()
+
+
+# PNG of the cluster plot, memoized per (data_version, selected cluster).
+# data_version must change whenever x, y or labels change.
+def cluster_plot_png(data_version, x, y, labels, selected, xlabel, ylabel, mode=None):
+    if mode is None:
+        mode = "density" if len(x) > SCATTER_MAX_POINTS else "scatter"
+    key = (data_version, selected, xlabel, ylabel, mode)
+    with _plot_lock:
+        png = _plot_cache.get(key)
+        if png is not None:
+            _plot_cache.move_to_end(key)
+            return png
+    png = _render(np.asarray(x), np.asarray(y), np.asarray(labels), selected, xlabel, ylabel, mode)
+    with _plot_lock:
+        _plot_cache[key] = png
+        while len(_plot_cache) > PLOT_CACHE_SIZE:
+            _plot_cache.popitem(last=False)
+    return png
@@ -0,0 +1,163 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from dataclasses import dataclass
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# Rows per block when computing point-to-centre distances (bounds memory to
+# DISTANCE_CHUNK_ROWS * k floats regardless of dataset size)
+DISTANCE_CHUNK_ROWS = 65536
+BATCH_SIZE = 4096
+MAX_ITER = 100
+# Stop once centres have barely moved for this many consecutive batches
+PATIENCE = 10
+# k-means++ seeding runs on a sample this large
+SEEDING_SAMPLE = 20000
+RESULT_CACHE_SIZE = 32
+
+
+@dataclass(frozen=True)
+class KMeansResult:
+    centers: np.ndarray
+    labels: np.ndarray
+    inertia: float
+    n_iter: int
+
+
+# Synthetic Gaussian mixture with `n_clusters` blobs and the true labels.
+# Results are cached (and read-only) so reruns don't regenerate them.
+@lru_cache(maxsize=4)
+def gaussian_mixture(n_points, n_clusters, n_features=2, spread=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.uniform(-10, 10, size=(n_clusters, n_features))
+    truth = rng.integers(0, n_clusters, size=n_points).astype(np.int32)
+    points = (means[truth] + rng.normal(scale=spread, size=(n_points, n_features))).astype(np.float32)
+    points.setflags(write=False)
+    truth.setflags(write=False)
+    return points, truth
+
+
+def data_hash(points):
+    return hashlib.sha256(np.ascontiguousarray(points).tobytes()).hexdigest()
+
+
+def _squared_distances(block, centers, center_norms):
+    distances = block @ centers.T
+    distances *= -2
+    distances += center_norms
+    distances += np.einsum("ij,ij->i", block, block)[:, None]
+    return distances
+
+
+# Nearest centre for every point, computed in fixed-size row blocks
+def assign_labels(points, centers, chunk_rows=DISTANCE_CHUNK_ROWS):
+    labels = np.empty(len(points), dtype=np.int32)
+    center_norms = np.einsum("ij,ij->i", centers, centers)
+    inertia = 0.0
+    for start in range(0, len(points), chunk_rows):
+        block = points[start:start + chunk_rows]
+        distances = _squared_distances(block, centers, center_norms)
+        block_labels = distances.argmin(axis=1)
+        labels[start:start + chunk_rows] = block_labels
+        inertia += float(np.maximum(distances[np.arange(len(block)), block_labels], 0).sum())
+    return labels, inertia
+
+
+# k-means++ seeding: each new centre is drawn with probability proportional
+# to its squared distance from the nearest centre chosen so far
+def kmeans_plusplus(points, k, rng):
+    if len(points) > SEEDING_SAMPLE:
+        points = points[rng.choice(len(points), SEEDING_SAMPLE, replace=False)]
+    centers = np.empty((k, points.shape[1]), dtype=points.dtype)
+    centers[0] = points[rng.integers(len(points))]
+    closest = ((points - centers[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = closest.sum()
+        if total <= 0:
+            centers[i] = points[rng.integers(len(points))]
+        else:
+            centers[i] = points[rng.choice(len(points), p=closest / total)]
+        closest = np.minimum(closest, ((points - centers[i]) ** 2).sum(axis=1))
+    return centers
+
+
+# Mini-batch k-means (Sculley, 2010) with per-centre learning rates.
+# Each step moves centres towards the mean of their assigned batch points,
+# weighted by how many points each centre has absorbed so far.
+def minibatch_kmeans(points, k, seed=0, batch_size=BATCH_SIZE, max_iter=MAX_ITER, tol=1e-4):
+    points = np.ascontiguousarray(points, dtype=np.float32)
+    k = min(k, len(points))
+    rng = np.random.default_rng(seed)
+    centers = kmeans_plusplus(points, k, rng).astype(np.float64)
+    counts = np.zeros(k)
+    scale = float(points.var(axis=0).sum()) or 1.0
+    n_iter = 0
+    quiet_steps = 0
+    for n_iter in range(1, max_iter + 1):
+        batch = points[rng.integers(0, len(points), size=min(batch_size, len(points)))].astype(np.float64)
+        batch_labels = _squared_distances(batch, centers, np.einsum("ij,ij->i", centers, centers)).argmin(axis=1)
+        batch_counts = np.bincount(batch_labels, minlength=k)
+        batch_sums = np.zeros_like(centers)
+        np.add.at(batch_sums, batch_labels, batch)
+        counts += batch_counts
+        moved = batch_counts > 0
+        shift = (batch_sums[moved] - batch_counts[moved, None] * centers[moved]) / counts[moved, None]
+        centers[moved] += shift
+        quiet_steps = quiet_steps + 1 if (shift ** 2).sum() / scale < tol else 0
+        if quiet_steps >= PATIENCE:
+            break
+    centers = centers.astype(np.float32)
+    labels, inertia = assign_labels(points, centers)
+    return KMeansResult(centers, labels, inertia, n_iter)
+
+
+_results = OrderedDict()
+_results_lock = threading.Lock()
+
+
+# Cluster `points` into k groups, memoized per (data hash, k, seed).
+# Features are standardized first so columns on different scales (price vs
+# rating) count equally; centres are reported in the original units.
+def cluster_points(points, k, seed=0, points_hash=None):
+    key = (points_hash or data_hash(points), k, seed)
+    with _results_lock:
+        result = _results.get(key)
+        if result is not None:
+            _results.move_to_end(key)
+            return result
+    points = np.asarray(points, dtype=np.float32)
+    mean = points.mean(axis=0)
+    std = points.std(axis=0)
+    std[std == 0] = 1.0
+    scaled = minibatch_kmeans((points - mean) / std, k, seed=seed)
+    result = KMeansResult(scaled.centers * std + mean, scaled.labels, scaled.inertia, scaled.n_iter)
+    with _results_lock:
+        _results[key] = result
+        while len(_results) > RESULT_CACHE_SIZE:
+            _results.popitem(last=False)
+    return result
+
+
+_csv_cache = OrderedDict()
+_csv_lock = threading.Lock()
+
+
+# Numeric columns of an uploaded CSV, parsed once per file content
+def read_numeric_csv(data, max_cached=4):
+    key = hashlib.sha256(data).hexdigest()
+    with _csv_lock:
+        frame = _csv_cache.get(key)
+        if frame is not None:
+            _csv_cache.move_to_end(key)
+            return frame
+    frame = pd.read_csv(BytesIO(data), engine="c", low_memory=False).select_dtypes("number")
+    frame = frame.astype(np.float32)
+    with _csv_lock:
+        _csv_cache[key] = frame
+        while len(_csv_cache) > max_cached:
+            _csv_cache.popitem(last=False)
+    return frame
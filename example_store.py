@@ -0,0 +1,170 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+import zlib
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from retrieval import tokenize
+from token_budget import estimate_tokens
+
+# Examples offered per prompt, and the prompt tokens they may use together
+EXAMPLES_K = int(os.environ.get("EXAMPLES_K", 10))
+EXAMPLES_MAX_TOKENS = int(os.environ.get("EXAMPLES_MAX_TOKENS", 1000))
+# Hashed feature space; collisions are rare at this size and harmless for ranking
+HASH_FEATURES = 1 << 20
+STORE_CACHE_SIZE = 8
+
+_REVIEW_KEYS = ("review", "prompt", "input")
+_RESPONSE_KEYS = ("response", "completion", "output")
+
+
+# Review text plus its word bigrams, hashed into HASH_FEATURES buckets
+def hashed_features(text):
+    terms = tokenize(text)
+    grams = terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+    return [zlib.crc32(gram.encode("utf-8")) & (HASH_FEATURES - 1) for gram in grams]
+
+
+def _pick(row, keys):
+    lowered = {str(key).strip().lower(): value for key, value in row.items()}
+    for key in keys:
+        value = lowered.get(key)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return None
+
+
+# Read review/response pairs from JSONL or CSV bytes. JSONL lines and CSV
+# headers may use review/response, prompt/completion or input/output.
+def load_examples(data, filename):
+    text = data.decode("utf-8-sig")
+    if filename.lower().endswith(".csv"):
+        rows = csv.DictReader(io.StringIO(text))
+    else:
+        rows = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number} is not valid JSON: {e.msg}") from None
+    examples = []
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        review, response = _pick(row, _REVIEW_KEYS), _pick(row, _RESPONSE_KEYS)
+        if review and response:
+            examples.append({"review": review, "response": response})
+    if not examples:
+        raise ValueError("No examples found; expected 'review' and 'response' fields.")
+    return examples
+
+
+# TF-IDF over hashed unigram and bigram features of each example's review,
+# with rows L2-normalised so a dot product is the cosine similarity.
+# Weights are stored per feature (CSR layout, as in retrieval.BM25Index), so
+# ranking a query only touches the postings of the query's features.
+class ExampleStore:
+    def __init__(self, examples):
+        self.examples = examples
+        self.costs = np.array([estimate_tokens(_example_text(e)) for e in examples], dtype=np.int32)
+        feature_ids, example_ids, counts = [], [], []
+        for example_id, example in enumerate(examples):
+            features = Counter(hashed_features(example["review"]))
+            feature_ids.extend(features)
+            counts.extend(features.values())
+            example_ids.extend([example_id] * len(features))
+        feature_ids = np.asarray(feature_ids, dtype=np.int64)
+        tf = 1.0 + np.log(np.asarray(counts, dtype=np.float32))
+        order = np.argsort(feature_ids, kind="stable")
+        self.features, starts = np.unique(feature_ids[order], return_index=True)
+        self.offsets = np.append(starts, len(order)).astype(np.int64)
+        self.example_ids = np.asarray(example_ids, dtype=np.int32)[order]
+        n = len(examples)
+        doc_freq = np.diff(self.offsets).astype(np.float32)
+        self.idf = (np.log((1 + n) / (1 + doc_freq)) + 1).astype(np.float32)
+        weights = tf[order] * np.repeat(self.idf, np.diff(self.offsets))
+        norms = np.sqrt(np.bincount(self.example_ids, weights=weights * weights, minlength=n)).astype(np.float32)
+        self.weights = weights / np.maximum(norms[self.example_ids], 1e-12)
+
+    def __len__(self):
+        return len(self.examples)
+
+    # Cosine similarity of every example's review to `text`
+    def scores(self, text):
+        scores = np.zeros(len(self.examples), dtype=np.float32)
+        counts = Counter(hashed_features(text))
+        if not counts:
+            return scores
+        query = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        positions = np.searchsorted(self.features, query)
+        positions[positions == len(self.features)] = 0
+        known = self.features[positions] == query if len(self.features) else np.zeros(len(query), dtype=bool)
+        tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        query_weights = tf[known] * self.idf[positions[known]]
+        norm = np.sqrt(float(np.dot(query_weights, query_weights))) or 1.0
+        for position, weight in zip(positions[known], query_weights / norm):
+            lo, hi = self.offsets[position], self.offsets[position + 1]
+            scores[self.example_ids[lo:hi]] += weight * self.weights[lo:hi]
+        return scores
+
+    # The (at most k) examples most similar to `text` that fit in `max_tokens`
+    # together, returned in store order. Indices in `exclude` are never picked;
+    # when fewer than k examples match at all, the earliest ones fill the gap.
+    def select(self, text, k=EXAMPLES_K, max_tokens=EXAMPLES_MAX_TOKENS, exclude=()):
+        scores = self.scores(text)
+        if len(exclude):
+            scores[np.asarray(list(exclude), dtype=np.int64)] = -np.inf
+        # A few spare candidates in case the best ones don't fit the budget
+        candidates = k * 4
+        ranked = np.flatnonzero(scores > 0)
+        if len(ranked) > candidates:
+            ranked = ranked[np.argpartition(-scores[ranked], candidates - 1)[:candidates]]
+        ranked = ranked[np.lexsort((ranked, -scores[ranked]))]
+        if len(ranked) < candidates:
+            ranked = np.concatenate([ranked, np.flatnonzero(scores == 0)[:candidates - len(ranked)]])
+        selected = []
+        used = 0
+        for example_id in ranked:
+            if len(selected) == k:
+                break
+            cost = int(self.costs[example_id])
+            if used + cost > max_tokens:
+                continue
+            selected.append(example_id)
+            used += cost
+        return [self.examples[i] for i in sorted(selected)]
+
+
+def _example_text(example):
+    return f"Review: {example['review']}\nResponse: {example['response']}"
+
+
+_store_cache = OrderedDict()
+_store_lock = threading.Lock()
+
+
+def examples_key(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# Example store for a set of examples, built once per key (e.g. the hash of
+# the uploaded file) and kept in a small process-wide LRU
+def get_store(key, examples):
+    with _store_lock:
+        store = _store_cache.get(key)
+        if store is not None:
+            _store_cache.move_to_end(key)
+            return store
+    store = ExampleStore(examples)
+    with _store_lock:
+        _store_cache[key] = store
+        while len(_store_cache) > STORE_CACHE_SIZE:
+            _store_cache.popitem(last=False)
+    return store
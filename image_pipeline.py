@@ -0,0 +1,174 @@
+import hashlib
+import os
+import random
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from metrics import timed
+
+# Longest side uploaded images are downscaled to before any processing
+MAX_IMAGE_SIDE = int(os.environ.get("MAX_IMAGE_SIDE", 1600))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Multi-scale inpainting solves the hole at this resolution, then refines upwards
+PYRAMID_BASE_SIDE = 512
+
+
+# Decoded, size-bounded RGB image shared by every later step.
+# `pixels` is a C-contiguous, read-only uint8 array of shape (H, W, 3).
+@dataclass(frozen=True)
+class IngestedImage:
+    key: str
+    pixels: np.ndarray
+    original_size: tuple
+
+    @property
+    def downscaled(self):
+        return self.pixels.shape[1::-1] != self.original_size
+
+
+# Small thread-safe LRU bounded by total array size
+class _ArrayCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value
+            self._size += nbytes
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= _nbytes(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+def _nbytes(value):
+    if isinstance(value, IngestedImage):
+        return value.pixels.nbytes
+    return sum(array.nbytes for array in value)
+
+
+_image_cache = _ArrayCache(IMAGE_CACHE_MAX_BYTES)
+
+
+def _read_only(array):
+    array = np.ascontiguousarray(array, dtype=np.uint8)
+    array.setflags(write=False)
+    return array
+
+
+# Decode an uploaded image once per (file content, max_side).
+# JPEGs are decoded at reduced scale via draft mode, so a 24-megapixel photo
+# never materializes at full resolution.
+def ingest_image(data, max_side=MAX_IMAGE_SIDE):
+    key = f"{hashlib.sha256(data).hexdigest()}-{max_side}"
+    cached = _image_cache.get(key)
+    if cached is not None:
+        return cached
+    with Image.open(BytesIO(data)) as image:
+        original_size = image.size
+        image.draft("RGB", (max_side, max_side))
+        image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        pixels = _read_only(np.asarray(image))
+    ingested = IngestedImage(key, pixels, original_size)
+    _image_cache.put(key, ingested, pixels.nbytes)
+    return ingested
+
+
+# Rectangle (top, left, height, width) covering `mask_percentage` of each side,
+# placed deterministically from `seed`
+def mask_rect(height, width, mask_percentage, seed):
+    mask_height = int((mask_percentage / 100) * height)
+    mask_width = int((mask_percentage / 100) * width)
+    rng = random.Random(seed)
+    top = rng.randint(0, height - mask_height)
+    left = rng.randint(0, width - mask_width)
+    return top, left, mask_height, mask_width
+
+
+# Masked copy of the image and its inpainting mask, cached per
+# (image, mask size, seed) so reruns reuse the same arrays
+def mask_image(ingested, mask_percentage, seed):
+    key = (ingested.key, mask_percentage, seed)
+    cached = _image_cache.get(key)
+    if cached is not None:
+        return cached
+    height, width, _ = ingested.pixels.shape
+    top, left, mask_height, mask_width = mask_rect(height, width, mask_percentage, seed)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    mask[top:top + mask_height, left:left + mask_width] = 255
+    masked = ingested.pixels.copy()
+    masked[top:top + mask_height, left:left + mask_width] = 0
+    result = (_read_only(masked), _read_only(mask))
+    _image_cache.put(key, result, masked.nbytes + mask.nbytes)
+    return result
+
+
+def new_mask_seed():
+    return random.SystemRandom().randrange(2 ** 32)
+
+
+# Fill the masked area of an RGB image with OpenCV's Telea inpainting.
+# mode="direct" inpaints at full resolution, where cost grows with the number
+# of masked pixels. mode="pyramid" inpaints a downscaled copy whose long side
+# is at most PYRAMID_BASE_SIDE, then walks back up the pyramid pasting the
+# upsampled fill into the hole and re-inpainting only a thin band along its
+# border to hide the seam, so large images and masks finish in bounded time.
+def inpaint_image(pixels, mask, mode="pyramid", radius=3, task=None):
+    with timed("inpaint", mode=mode):
+        return _inpaint(pixels, mask, mode, radius, task)
+
+
+def _inpaint(pixels, mask, mode, radius, task):
+    import cv2
+
+    if mode == "direct" or max(pixels.shape[:2]) <= PYRAMID_BASE_SIDE:
+        return cv2.inpaint(pixels, mask, inpaintRadius=radius, flags=cv2.INPAINT_TELEA)
+
+    levels = [(pixels, mask)]
+    while max(levels[-1][0].shape[:2]) > PYRAMID_BASE_SIDE:
+        image, level_mask = levels[-1]
+        smaller_mask = cv2.pyrDown(level_mask)
+        # Any pixel touched by the hole stays in the hole
+        smaller_mask[smaller_mask > 0] = 255
+        levels.append((cv2.pyrDown(image), smaller_mask))
+
+    steps = len(levels)
+    image, level_mask = levels.pop()
+    filled = cv2.inpaint(image, level_mask, inpaintRadius=radius, flags=cv2.INPAINT_TELEA)
+    seam_kernel = np.ones((5, 5), dtype=np.uint8)
+    while levels:
+        if task is not None:
+            task.set_progress((steps - len(levels)) / steps)
+        image, level_mask = levels.pop()
+        height, width = level_mask.shape
+        upsampled = cv2.resize(filled, (width, height), interpolation=cv2.INTER_LINEAR)
+        hole = level_mask > 0
+        filled = image.copy()
+        filled[hole] = upsampled[hole]
+        seam = cv2.morphologyEx(level_mask, cv2.MORPH_GRADIENT, seam_kernel)
+        filled = cv2.inpaint(filled, seam, inpaintRadius=radius, flags=cv2.INPAINT_TELEA)
+    if task is not None:
+        task.set_progress(1.0)
+    return filled
@@ -0,0 +1,119 @@
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+import threading
+
+import xlsxwriter
+
+from metrics import current_session, timed
+
+EXPORT_COLUMNS = ["Timestamp", "Student Name", "Prompt", "AI Response"]
+# Logs with more rows than this are written with xlsxwriter's constant-memory mode
+CONSTANT_MEMORY_ROWS = 2000
+PARQUET_BATCH_ROWS = 10000
+
+# Parquet export is optional; pyarrow is only imported when a Parquet file is built
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def _columns(rows):
+    columns = list(EXPORT_COLUMNS)
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    return columns
+
+
+# Write rows (dicts) to an .xlsx workbook row by row.
+# Large logs go through a temporary file in constant-memory mode, which
+# flushes each row to disk instead of keeping the whole sheet in memory.
+def export_xlsx(rows):
+    columns = _columns(rows)
+    constant_memory = len(rows) > CONSTANT_MEMORY_ROWS
+    if constant_memory:
+        handle, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(handle)
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    else:
+        output = io.BytesIO()
+        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+    try:
+        worksheet = workbook.add_worksheet("Interactions")
+        header = workbook.add_format({"bold": True, "border": 1})
+        worksheet.write_row(0, 0, columns, header)
+        for row_number, row in enumerate(rows, start=1):
+            worksheet.write_row(row_number, 0, [row.get(column, "") for column in columns])
+        workbook.close()
+        if constant_memory:
+            with open(path, "rb") as f:
+                return f.read()
+        return output.getvalue()
+    finally:
+        if constant_memory:
+            os.remove(path)
+
+
+# CSV encoded straight into one bytes buffer, row by row
+def export_csv(rows):
+    output = io.BytesIO()
+    text = io.TextIOWrapper(output, encoding="utf-8", newline="", write_through=True)
+    writer = csv.DictWriter(text, fieldnames=_columns(rows), extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(rows)
+    text.detach()
+    return output.getvalue()
+
+
+# Parquet written in record batches, one column list per batch
+def export_parquet(rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = _columns(rows)
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    output = io.BytesIO()
+    with pq.ParquetWriter(output, schema) as writer:
+        for start in range(0, len(rows), PARQUET_BATCH_ROWS):
+            batch = rows[start:start + PARQUET_BATCH_ROWS]
+            arrays = [pa.array([_as_text(row.get(column)) for row in batch], pa.string()) for column in columns]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+    return output.getvalue()
+
+
+def _as_text(value):
+    return None if value is None else str(value)
+
+
+EXPORT_FORMATS = {
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", export_xlsx),
+    "CSV": ("csv", "text/csv", export_csv),
+}
+if HAS_PYARROW:
+    EXPORT_FORMATS["Parquet"] = ("parquet", "application/vnd.apache.parquet", export_parquet)
+
+
+# Remembers the last export of each format for one interaction log, tagged
+# with the log version it was built from
+class ExportMemo:
+    def __init__(self):
+        self._exports = {}
+        self._lock = threading.Lock()
+
+    # Zero-argument callable for st.download_button: builds the file for the
+    # first `count` rows only when clicked, and reuses it while `version` is
+    # unchanged. The log is append-only, so rows[:count] is a stable snapshot.
+    def lazy(self, rows, count, version, export_format):
+        # Downloads are built on Streamlit's download thread, outside the rerun
+        session = current_session.get()
+
+        def build():
+            with self._lock:
+                cached = self._exports.get(export_format)
+                if cached is not None and cached[0] == version:
+                    return cached[1]
+                with timed("export", session=session, format=export_format):
+                    data = EXPORT_FORMATS[export_format][2](rows[:count])
+                self._exports[export_format] = (version, data)
+                return data
+        return build
@@ -0,0 +1,318 @@
+"""Durable interaction log shared by every session.
+
+Interactions are queued by save_interaction and written in batches by a
+background thread to SQLite (default), JSONL or Google Sheets. Instructors
+can pull a section's records from the command line:
+
+    python -m interaction_log export --student "Ana" --since 2026-09-01 --format csv -o ana.csv
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+# "sqlite", "jsonl", "gsheets" or "none"
+INTERACTION_LOG_BACKEND = os.environ.get("INTERACTION_LOG_BACKEND", "sqlite")
+# Log file; defaults to interactions.db (sqlite) or interactions.jsonl (jsonl)
+INTERACTION_LOG_PATH = os.environ.get("INTERACTION_LOG_PATH", "")
+INTERACTION_LOG_QUEUE = int(os.environ.get("INTERACTION_LOG_QUEUE", 10000))
+INTERACTION_LOG_BATCH = int(os.environ.get("INTERACTION_LOG_BATCH", 200))
+# Seconds the writer waits to fill a batch before writing what it has
+INTERACTION_LOG_FLUSH_INTERVAL = float(os.environ.get("INTERACTION_LOG_FLUSH_INTERVAL", 1.0))
+# Seconds save_interaction may block on a full queue before the record is dropped
+INTERACTION_LOG_PUT_TIMEOUT = float(os.environ.get("INTERACTION_LOG_PUT_TIMEOUT", 2.0))
+# Attempts per batch once the sink is closing; batches that still fail are dropped and counted
+INTERACTION_LOG_CLOSE_ATTEMPTS = int(os.environ.get("INTERACTION_LOG_CLOSE_ATTEMPTS", 5))
+GSHEETS_CREDENTIALS = os.environ.get("GSHEETS_CREDENTIALS", "")
+GSHEETS_SHEET_ID = os.environ.get("GSHEETS_SHEET_ID", "")
+# Write the "gsheets" backend to an in-memory tools.stub_worksheet.StubWorksheet
+# instead of Google Sheets, optionally slow (seconds per call) or failing every Nth call
+GSHEETS_STUB = os.environ.get("GSHEETS_STUB", "").lower() in ("1", "true", "yes")
+GSHEETS_STUB_LATENCY = float(os.environ.get("GSHEETS_STUB_LATENCY", 0))
+GSHEETS_STUB_FAIL_EVERY = int(os.environ.get("GSHEETS_STUB_FAIL_EVERY", 0))
+
+FIELDS = [
+    ("Timestamp", "timestamp"),
+    ("Student Name", "student"),
+    ("Prompt", "prompt"),
+    ("AI Response", "response"),
+    ("Session", "session"),
+]
+
+logger = logging.getLogger(__name__)
+
+
+# Append-only SQLite store in WAL mode, indexed by student and time
+class SQLiteBackend:
+    def __init__(self, path="interactions.db"):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS interactions ("
+            "id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, student TEXT, "
+            "prompt TEXT, response TEXT, session TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS interactions_student_time ON interactions (student, timestamp)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS interactions_time ON interactions (timestamp)")
+        self._db.commit()
+
+    def write_batch(self, records):
+        rows = [tuple(record.get(name) for name, _ in FIELDS) for record in records]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO interactions (timestamp, student, prompt, response, session) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    # Records for a student and/or timestamp range ("YYYY-MM-DD[ HH:MM:SS]"),
+    # oldest first. Read through a connection of its own (WAL lets it run
+    # alongside the writer), so a slow or abandoned consumer never holds up writes.
+    def query(self, student=None, since=None, until=None):
+        clauses, params = [], []
+        if student:
+            clauses.append("student = ?")
+            params.append(student)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until if len(until) > 10 else until + " 23:59:59")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        columns = ", ".join(column for _, column in FIELDS)
+        reader = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            cursor = reader.execute(f"SELECT {columns} FROM interactions{where} ORDER BY timestamp, id", params)
+            for row in cursor:
+                yield dict(zip((name for name, _ in FIELDS), row))
+        finally:
+            reader.close()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# One JSON object per line, appended and fsynced per batch
+class JSONLBackend:
+    def __init__(self, path="interactions.jsonl"):
+        self.path = path
+
+    def write_batch(self, records):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def query(self, student=None, since=None, until=None):
+        if until and len(until) <= 10:
+            until += " 23:59:59"
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if student and record.get("Student Name") != student:
+                    continue
+                if since and record["Timestamp"] < since:
+                    continue
+                if until and record["Timestamp"] > until:
+                    continue
+                yield record
+
+    def close(self):
+        pass
+
+
+# Appends batches of rows to a Google Sheets worksheet (one API call per batch).
+# Pass `worksheet` to use any object with gspread's append_rows(), such as
+# tools.stub_worksheet.StubWorksheet in development (see GSHEETS_STUB).
+# Write-only: export from the SQLite or JSONL log.
+class GoogleSheetsBackend:
+    def __init__(self, worksheet=None, credentials=GSHEETS_CREDENTIALS, sheet_id=GSHEETS_SHEET_ID):
+        if worksheet is None:
+            import gspread
+
+            worksheet = gspread.service_account(filename=credentials).open_by_key(sheet_id).sheet1
+        self.worksheet = worksheet
+
+    def write_batch(self, records):
+        rows = [[record.get(name, "") for name, _ in FIELDS] for record in records]
+        self.worksheet.append_rows(rows, value_input_option="RAW")
+
+    def close(self):
+        pass
+
+
+# Batches interaction records off the request path.
+# record() enqueues and returns immediately; a writer thread drains the queue
+# in batches of up to `batch_size`, retrying failed writes with backoff. A
+# full queue blocks callers for up to `put_timeout` seconds (backpressure)
+# before the record is dropped and counted. Pending records are flushed at
+# interpreter shutdown; once `close_attempts` writes in a row have failed
+# during shutdown, the remaining batches are dropped and counted.
+class InteractionSink:
+    def __init__(self, backend, max_queue=INTERACTION_LOG_QUEUE, batch_size=INTERACTION_LOG_BATCH,
+                 flush_interval=INTERACTION_LOG_FLUSH_INTERVAL, put_timeout=INTERACTION_LOG_PUT_TIMEOUT,
+                 close_attempts=INTERACTION_LOG_CLOSE_ATTEMPTS):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.close_attempts = close_attempts
+        self._closing_failures = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self._thread = threading.Thread(target=self._run, name="interaction-log", daemon=True)
+        self._thread.start()
+
+    def record(self, record):
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Interaction log queue is full; dropped a record")
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    # Retry until the batch is written; while closing, give up once
+    # close_attempts writes in a row have failed and count the batch as dropped
+    def _write(self, batch):
+        delay = 0.5
+        while True:
+            try:
+                self.backend.write_batch(batch)
+                self.written += len(batch)
+                self.batches += 1
+                self._closing_failures = 0
+                return
+            except Exception:
+                self.write_errors += 1
+                logger.exception("Writing %d interactions failed", len(batch))
+                if self._closed.is_set():
+                    self._closing_failures += 1
+                    if self._closing_failures >= self.close_attempts:
+                        self.dropped += len(batch)
+                        logger.error("Dropped %d interactions that could not be written at shutdown", len(batch))
+                        return
+                    # Shutdown shouldn't wait out the long backoff
+                    delay = min(delay, 1.0)
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def _run(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    # Block until everything queued so far has been written (or failed)
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self._closed.set()
+        self._thread.join()
+        self.backend.close()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+        }
+
+
+def make_backend(name=INTERACTION_LOG_BACKEND, path=INTERACTION_LOG_PATH):
+    if name == "sqlite":
+        return SQLiteBackend(path or "interactions.db")
+    if name == "jsonl":
+        return JSONLBackend(path or "interactions.jsonl")
+    if name == "gsheets":
+        if GSHEETS_STUB:
+            from tools.stub_worksheet import StubWorksheet
+
+            return GoogleSheetsBackend(StubWorksheet(GSHEETS_STUB_LATENCY, GSHEETS_STUB_FAIL_EVERY))
+        return GoogleSheetsBackend()
+    raise ValueError(f"Unknown interaction log backend: {name}")
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+# Process-wide sink for the configured backend (None when logging is disabled)
+def get_sink():
+    global _sink
+    if INTERACTION_LOG_BACKEND == "none":
+        return None
+    with _sink_lock:
+        if _sink is None:
+            _sink = InteractionSink(make_backend())
+            atexit.register(_sink.close)
+        return _sink
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export logged student interactions.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    export = subcommands.add_parser("export", help="write matching records to a file or stdout")
+    export.add_argument("--backend", default=INTERACTION_LOG_BACKEND, choices=["sqlite", "jsonl"])
+    export.add_argument("--path", default=INTERACTION_LOG_PATH, help="default: interactions.db or interactions.jsonl")
+    export.add_argument("--student")
+    export.add_argument("--since", help="YYYY-MM-DD[ HH:MM:SS]")
+    export.add_argument("--until", help="YYYY-MM-DD[ HH:MM:SS]")
+    export.add_argument("--format", default="csv", choices=["csv", "xlsx", "parquet", "jsonl"])
+    export.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    from interaction_export import export_csv, export_parquet, export_xlsx
+
+    backend = make_backend(args.backend, args.path)
+    records = list(backend.query(args.student, args.since, args.until))
+    if args.format == "jsonl":
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+    else:
+        data = {"csv": export_csv, "xlsx": export_xlsx, "parquet": export_parquet}[args.format](records)
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(data)
+    else:
+        sys.stdout.buffer.write(data)
+    print(f"Exported {len(records)} interactions.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
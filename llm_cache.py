@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import registry
+
+# Response caching is opt-in: set LLM_CACHE=1 to enable it for the process
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 24 * 60 * 60))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+# Only requests at or below this temperature are cached (0 = deterministic only)
+LLM_CACHE_MAX_TEMPERATURE = float(os.environ.get("LLM_CACHE_MAX_TEMPERATURE", 0.0))
+LLM_CACHE_DB = os.environ.get("LLM_CACHE_DB", "")
+
+
+# Canonical hash of everything that determines a completion
+def cache_key(model, messages, temperature, max_tokens):
+    canonical = json.dumps(
+        {
+            "model": model,
+            "messages": [{"role": m["role"], "content": m["content"].strip()} for m in messages],
+            "temperature": round(float(temperature), 3),
+            "max_tokens": int(max_tokens),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# Process-wide cache of completion texts.
+# Entries expire after `ttl` seconds, the in-memory LRU is bounded by total
+# text size, and an optional SQLite file keeps responses across restarts
+# and shares them between server processes.
+class ResponseCache:
+    def __init__(self, enabled=LLM_CACHE_ENABLED, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES,
+                 max_temperature=LLM_CACHE_MAX_TEMPERATURE, db_path=LLM_CACHE_DB or None):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_temperature = max_temperature
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, text TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def cacheable(self, temperature):
+        return self.enabled and temperature <= self.max_temperature
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                text, size, created = entry
+                if now - created <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    registry.inc("uncgai_llm_cache_lookups_total", result="hit")
+                    return text
+                del self._entries[key]
+                self._size -= size
+                self._publish()
+            row = None
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT text, created FROM responses WHERE key = ? AND created >= ?",
+                    (key, now - self.ttl),
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+                registry.inc("uncgai_llm_cache_lookups_total", result="miss")
+                return None
+            self.db_hits += 1
+            registry.inc("uncgai_llm_cache_lookups_total", result="db_hit")
+            self._store(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key, text, model=None):
+        created = time.time()
+        with self._lock:
+            self._store(key, text, created)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, text, created) VALUES (?, ?, ?, ?)",
+                    (key, model, text, created),
+                )
+                self._db.commit()
+
+    def _store(self, key, text, created):
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        self._entries[key] = (text, size, created)
+        self._size += size
+        while self._size > self.max_bytes and self._entries:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self.evictions += 1
+            registry.inc("uncgai_llm_cache_evictions_total")
+        self._publish()
+
+    # Cache size as gauges; called whenever it changes. Call with the lock held.
+    def _publish(self):
+        registry.set("uncgai_llm_cache_entries", len(self._entries))
+        registry.set("uncgai_llm_cache_bytes", self._size)
+
+    # Drop expired rows from the SQLite store
+    def purge_expired(self):
+        if self._db is None:
+            return 0
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            self._db.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.db_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hit_rate": (self.hits + self.db_hits) / lookups if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,377 @@
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import openai
+
+from llm_cache import cache_key, response_cache
+from llm_dispatch import HTTP_POOL_SIZE, dispatcher
+from llm_resilience import (
+    FALLBACK_MODELS, LLM_DEADLINE, LLM_LATENCY_MIN_SAMPLES, LLM_LATENCY_WINDOW, LLM_REQUEST_TIMEOUT,
+    CircuitOpenError, Deadline, DeadlineExceeded, RetryPolicy, breaker_for, hedge_budget, is_outage, is_retryable,
+    latency_settings,
+)
+from metrics import record_completion, registry
+from token_budget import estimate_tokens
+
+# Point the app at another OpenAI-compatible endpoint (e.g. tools/fake_openai.py)
+OPENAI_API_BASE = os.environ.get("OPENAI_API_BASE") or None
+
+
+# Finished chat completion with its timings
+@dataclass
+class Completion:
+    text: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float
+    time_to_first_token: float
+    streamed: bool = False
+    cached: bool = False
+    # Model that was asked for when the answer came from its fallback instead
+    fallback_from: Optional[str] = None
+
+
+# Recent completion timings for the whole process, as (finished, completion)
+_timings = deque(maxlen=1000)
+_timings_lock = threading.Lock()
+
+
+def _record(completion):
+    with _timings_lock:
+        _timings.append((time.monotonic(), completion))
+    record_completion(completion)
+
+
+# Forget the recorded timings, so latency-based choices start from scratch
+def reset_timings():
+    with _timings_lock:
+        _timings.clear()
+
+
+# Median and p95 latency and time-to-first-token over recent completions, per model
+def latency_summary():
+    with _timings_lock:
+        recent = [completion for _, completion in _timings]
+    summary = {}
+    for model in sorted({c.model for c in recent}):
+        latencies = sorted(c.latency for c in recent if c.model == model)
+        ttfts = sorted(c.time_to_first_token for c in recent if c.model == model)
+        summary[model] = {
+            "count": len(latencies),
+            "p50_latency": latencies[len(latencies) // 2],
+            "p95_latency": latencies[int(len(latencies) * 0.95)],
+            "p50_ttft": ttfts[len(ttfts) // 2],
+            "p95_ttft": ttfts[int(len(ttfts) * 0.95)],
+        }
+    return summary
+
+
+# p95 latency (or time to first token, for streams) of a model's completions
+# in the last LLM_LATENCY_WINDOW seconds; None with fewer than
+# LLM_LATENCY_MIN_SAMPLES of them, so a model that was swapped for its
+# fallback is tried again once its slow samples age out
+def latency_p95(model, streamed=False):
+    since = time.monotonic() - LLM_LATENCY_WINDOW
+    with _timings_lock:
+        values = [c.time_to_first_token if streamed else c.latency
+                  for finished, c in _timings if finished >= since and c.model == model and c.streamed == streamed]
+    if len(values) < LLM_LATENCY_MIN_SAMPLES:
+        return None
+    values.sort()
+    return values[int(len(values) * 0.95)]
+
+
+def _prompt_tokens(messages):
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages)
+
+
+# Send a chat completion request.
+# With stream=True (or an on_token callback) tokens are read as they arrive
+# and on_token is called with the text received so far. Cacheable requests
+# (see llm_cache) are answered from the response cache when possible.
+# Everything, including retries, must finish within `deadline` seconds
+# (default LLM_DEADLINE); see _send for retries, hedging and fallbacks.
+def complete(api_key, messages, model, temperature, max_tokens, stream=None, on_token=None,
+             cache=response_cache, deadline=None):
+    if stream is None:
+        stream = on_token is not None
+    deadline = Deadline(LLM_DEADLINE if deadline is None else deadline)
+    start = time.perf_counter()
+    request_key = cache_key(model, messages, temperature, max_tokens)
+    use_cache = cache.cacheable(temperature)
+    if use_cache:
+        text = cache.get(request_key)
+        if text is not None:
+            if on_token is not None:
+                on_token(text)
+            latency = time.perf_counter() - start
+            completion = Completion(
+                text=text,
+                model=model,
+                prompt_tokens=_prompt_tokens(messages),
+                completion_tokens=estimate_tokens(text),
+                latency=latency,
+                time_to_first_token=latency,
+                streamed=stream,
+                cached=True,
+            )
+            record_completion(completion)
+            return completion
+
+    # Rate-limit budgets count max_tokens, as OpenAI does
+    tokens = _prompt_tokens(messages) + max_tokens
+
+    def call():
+        completion = _send(api_key, messages, model, temperature, max_tokens, stream, on_token, deadline, tokens)
+        _record(completion)
+        # A fallback model's answer is not cached under the requested model
+        if use_cache and completion.text and completion.fallback_from is None:
+            cache.put(request_key, completion.text, model=model)
+        return completion
+
+    try:
+        completion, shared = dispatcher.dispatch(api_key, request_key, tokens, call, timeout=deadline.remaining())
+    except (DeadlineExceeded, CircuitOpenError) as e:
+        registry.inc("uncgai_llm_failfast_total", model=model, reason=type(e).__name__)
+        raise
+    if shared and on_token is not None:
+        on_token(completion.text)
+    return completion
+
+
+retry_policy = RetryPolicy()
+
+
+# The model to ask next: `model` unless its circuit is open or its recent p95
+# latency puts the latency SLO (or the time left) at risk, in which case its
+# fallback (FALLBACK_MODELS). Raises CircuitOpenError when neither can be used.
+def _pick_model(model, deadline, stream, avoid_primary=False):
+    fallback = FALLBACK_MODELS.get(model)
+    if fallback is not None:
+        p95 = latency_p95(model, stream)
+        at_risk = p95 is not None and (p95 > latency_settings.slo or p95 > deadline.remaining())
+        if not (avoid_primary or at_risk) and breaker_for(model).allow():
+            return model
+        if breaker_for(fallback).allow():
+            return fallback
+    elif breaker_for(model).allow():
+        return model
+    raise CircuitOpenError(f"{model} is not responding right now; please try again in a minute.")
+
+
+# One completion with jittered exponential retries on rate limits and
+# outages, within the deadline. Each retry waits for its own rate-limit
+# capacity (the first attempt's was taken by the dispatcher). After an
+# outage error a model with a fallback is not asked again for this completion.
+def _send(api_key, messages, model, temperature, max_tokens, stream, on_token, deadline, tokens):
+    avoid_primary = False
+    attempt = 0
+    while True:
+        attempt += 1
+        deadline.check()
+        if attempt > 1:
+            dispatcher.acquire(api_key, tokens, timeout=deadline.remaining())
+        chosen = _pick_model(model, deadline, stream, avoid_primary)
+        breaker = breaker_for(chosen)
+        try:
+            completion = _hedged_request(api_key, messages, chosen, temperature, max_tokens, stream, on_token,
+                                         deadline, tokens)
+        except Exception as e:
+            breaker.record(e)
+            if isinstance(e, (DeadlineExceeded, CircuitOpenError)) or not is_retryable(e) \
+                    or attempt >= retry_policy.max_attempts:
+                raise
+            delay = retry_policy.delay(attempt, e)
+            if delay >= deadline.remaining():
+                raise
+            registry.inc("uncgai_llm_retries_total", model=chosen, error=type(e).__name__)
+            avoid_primary = avoid_primary or (chosen == model and is_outage(e))
+            time.sleep(delay)
+            continue
+        breaker.record()
+        if chosen != model:
+            completion.fallback_from = model
+            registry.inc("uncgai_llm_fallbacks_total", model=model, fallback=chosen)
+        return completion
+
+
+class _Abandoned(Exception):
+    pass
+
+
+# First attempt of a hedged pair to produce a token (or an answer) wins; the
+# other one stops at its next token. Attempts run on pool threads and report
+# through `events`, so the caller's on_token (e.g. a Streamlit placeholder,
+# which only works on the script thread) is always called by the caller.
+class _HedgeRace:
+    def __init__(self):
+        self.winner = None
+        self.events = queue.Queue()
+        self._lock = threading.Lock()
+
+    def claim(self, index):
+        with self._lock:
+            if self.winner is None:
+                self.winner = index
+            return self.winner == index
+
+    def forward(self, index):
+        def on_token(text):
+            if not self.claim(index):
+                raise _Abandoned()
+            self.events.put(("token", index, text))
+        return on_token
+
+    def run(self, index, api_key, messages, model, temperature, max_tokens, stream, deadline):
+        try:
+            completion = _request(api_key, messages, model, temperature, max_tokens, stream, self.forward(index),
+                                  deadline)
+            self.events.put(("done", index, completion))
+        except BaseException as e:
+            self.events.put(("failed", index, e))
+
+
+# Hedged pairs run here, one worker per HTTP connection. A request only takes
+# a worker that is free right now (_hedge_slots), so attempts never queue
+# behind each other and hedge_after is measured from the moment one starts.
+_hedge_pool = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="llm-hedge")
+_hedge_slots = threading.BoundedSemaphore(HTTP_POOL_SIZE)
+
+
+def _run_in_slot(fn, *args):
+    try:
+        fn(*args)
+    finally:
+        _hedge_slots.release()
+
+
+# One attempt. When the model's p95 latency (time to first token, for
+# streams) is known and passes without an answer, a second copy is sent if
+# the hedge budget and the rate limits allow, and the first to answer wins.
+# Only requests that could be hedged (a hedge credit is reserved up front and
+# a pool worker is free) leave the caller's thread; the rest run on it.
+def _hedged_request(api_key, messages, model, temperature, max_tokens, stream, on_token, deadline, tokens):
+    hedge_budget.earn()
+    hedge_after = latency_p95(model, stream) if latency_settings.hedge else None
+    if hedge_after is None or hedge_after >= deadline.remaining() or not hedge_budget.spend():
+        return _request(api_key, messages, model, temperature, max_tokens, stream, on_token, deadline)
+    if not _hedge_slots.acquire(blocking=False):
+        hedge_budget.refund()
+        return _request(api_key, messages, model, temperature, max_tokens, stream, on_token, deadline)
+
+    race = _HedgeRace()
+
+    def attempt(index):
+        _hedge_pool.submit(contextvars.copy_context().run, _run_in_slot, race.run, index,
+                           api_key, messages, model, temperature, max_tokens, stream, deadline)
+
+    attempt(0)
+    running = 1
+    hedge_at = time.monotonic() + hedge_after
+    error = None
+    hedged = False
+    try:
+        while True:
+            if hedge_at is not None:
+                timeout = max(0.0, hedge_at - time.monotonic())
+            else:
+                # Attempts end by their own request timeout; this is only a backstop
+                timeout = deadline.remaining() + 1.0
+            try:
+                kind, index, value = race.events.get(timeout=timeout)
+            except queue.Empty:
+                if hedge_at is None:
+                    raise DeadlineExceeded(f"No response from OpenAI within {deadline.seconds:g}s.")
+                hedge_at = None
+                if race.winner is not None or not _hedge_slots.acquire(blocking=False):
+                    continue
+                if not dispatcher.try_acquire(api_key, tokens):
+                    _hedge_slots.release()
+                    continue
+                registry.inc("uncgai_llm_hedges_total", model=model)
+                attempt(1)
+                hedged = True
+                running += 1
+                continue
+            if kind == "token":
+                if on_token is not None:
+                    on_token(value)
+                continue
+            running -= 1
+            if kind == "done" and race.claim(index):
+                if index == 1:
+                    registry.inc("uncgai_llm_hedge_wins_total", model=model)
+                return value
+            if kind == "failed" and not isinstance(value, _Abandoned):
+                error = error or value
+            if running == 0 and error is not None:
+                raise error
+    finally:
+        # The credit reserved up front goes back unless a hedge was sent
+        if not hedged:
+            hedge_budget.refund()
+
+
+def _request(api_key, messages, model, temperature, max_tokens, stream, on_token, deadline=None):
+    start = time.perf_counter()
+    timeout = LLM_REQUEST_TIMEOUT
+    if deadline is not None:
+        deadline.check()
+        timeout = min(timeout, deadline.remaining())
+    response = openai.ChatCompletion.create(
+        api_key=api_key,
+        api_base=OPENAI_API_BASE,
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=stream,
+        request_timeout=timeout,
+    )
+    if not stream:
+        latency = time.perf_counter() - start
+        text = response.choices[0].message["content"].strip()
+        usage = response.get("usage") or {}
+        return Completion(
+            text=text,
+            model=model,
+            prompt_tokens=usage.get("prompt_tokens", _prompt_tokens(messages)),
+            completion_tokens=usage.get("completion_tokens", estimate_tokens(text)),
+            latency=latency,
+            time_to_first_token=latency,
+        )
+
+    parts = []
+    first_token_at = None
+    for chunk in response:
+        if not chunk.get("choices"):
+            continue
+        piece = chunk["choices"][0].get("delta", {}).get("content")
+        if not piece:
+            continue
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+        if deadline is not None:
+            deadline.check()
+        parts.append(piece)
+        if on_token is not None:
+            on_token("".join(parts))
+    end = time.perf_counter()
+    text = "".join(parts).strip()
+    return Completion(
+        text=text,
+        model=model,
+        prompt_tokens=_prompt_tokens(messages),
+        completion_tokens=estimate_tokens(text),
+        latency=end - start,
+        time_to_first_token=(first_token_at or end) - start,
+        streamed=True,
+    )
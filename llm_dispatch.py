@@ -0,0 +1,230 @@
+import hashlib
+import os
+import threading
+import time
+
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import registry
+
+# Per-API-key rate limits the dispatcher schedules against
+OPENAI_RPM = float(os.environ.get("OPENAI_RPM", 500))
+OPENAI_TPM = float(os.environ.get("OPENAI_TPM", 90000))
+# Longest a request may wait for rate-limit capacity before failing
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", 60))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 32))
+
+
+class QueueTimeout(RuntimeError):
+    pass
+
+
+# One keep-alive HTTP session shared by every thread.
+# openai 0.28 otherwise builds a session per thread, and Streamlit runs each
+# rerun on a new thread, so connections were never reused.
+def make_pooled_session(pool_size=HTTP_POOL_SIZE):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+pooled_session = make_pooled_session()
+openai.requestssession = pooled_session
+
+
+# Classic token bucket refilled continuously at `per_minute` units per minute
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    # Seconds until `amount` units are available (0 if they are available now)
+    def wait_time(self, amount, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # The leader was interrupted (e.g. its student's rerun stopped the
+        # script) rather than failing; waiting callers make the call themselves
+        self.abandoned = False
+
+
+# Shared front door for OpenAI traffic.
+# Identical in-flight requests are coalesced so only the first (the leader)
+# reaches the API, and each API key is held to its request and token budgets
+# by a pair of token buckets; callers queue until capacity frees up.
+class Dispatcher:
+    def __init__(self, rpm=OPENAI_RPM, tpm=OPENAI_TPM, queue_timeout=LLM_QUEUE_TIMEOUT):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._flights = {}
+        self.dispatched = 0
+        self.coalesced = 0
+        self.queued = 0
+        self.waiting = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.queue_timeouts = 0
+
+    @staticmethod
+    def _key_id(api_key):
+        return hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+
+    # Take room for one request of `tokens` if the key's buckets have it now;
+    # returns the seconds to wait otherwise (0.0 when taken). Call with the lock held.
+    def _try_take(self, key_id, tokens):
+        if key_id not in self._buckets:
+            self._buckets[key_id] = (TokenBucket(self.rpm), TokenBucket(self.tpm))
+        request_bucket, token_bucket = self._buckets[key_id]
+        now = time.monotonic()
+        wait = max(request_bucket.wait_time(1, now), token_bucket.wait_time(tokens, now))
+        if wait == 0.0:
+            request_bucket.take(1)
+            token_bucket.take(tokens)
+        return wait
+
+    # Block until the key's buckets have room for one request of `tokens`,
+    # for at most `timeout` seconds (default: the queue timeout)
+    def _acquire(self, api_key, tokens, timeout=None):
+        key_id = self._key_id(api_key)
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        start = time.monotonic()
+        queued = False
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_take(key_id, tokens)
+                    now = time.monotonic()
+                    if wait == 0.0:
+                        if queued:
+                            elapsed = now - start
+                            self.queue_wait_total += elapsed
+                            self.queue_wait_max = max(self.queue_wait_max, elapsed)
+                            registry.observe("uncgai_llm_queue_wait_seconds", elapsed)
+                        return
+                    if now - start + wait > timeout:
+                        self.queue_timeouts += 1
+                        registry.inc("uncgai_llm_queue_timeouts_total")
+                        raise QueueTimeout(
+                            f"OpenAI rate limit for this API key is saturated; try again in {wait:.0f}s."
+                        )
+                    if not queued:
+                        queued = True
+                        self.queued += 1
+                        self.waiting += 1
+                        registry.inc("uncgai_llm_queued_total")
+                        self._publish()
+                time.sleep(min(wait, 1.0))
+        finally:
+            if queued:
+                with self._lock:
+                    self.waiting -= 1
+                    self._publish()
+
+    # Block until the key has room for one more request (e.g. a retry)
+    def acquire(self, api_key, tokens, timeout=None):
+        self._acquire(api_key, tokens, timeout)
+        with self._lock:
+            self.dispatched += 1
+        registry.inc("uncgai_llm_dispatched_total")
+
+    # Room for one extra request (e.g. a hedge) only if the key has it right now
+    def try_acquire(self, api_key, tokens):
+        with self._lock:
+            if self._try_take(self._key_id(api_key), tokens) > 0.0:
+                return False
+            self.dispatched += 1
+            registry.inc("uncgai_llm_dispatched_total")
+            return True
+
+    # Run `call` for `request_key`, sharing the result with identical requests
+    # already in flight under the same API key (so nobody is answered, or
+    # refused, on a classmate's key). Returns (result, shared) where shared is
+    # True for callers that received another caller's result. `timeout` caps
+    # the whole wait: for an identical request's result, then for rate-limit
+    # capacity. Only results and ordinary errors are shared; if the leader is
+    # interrupted, a waiting caller takes over as the new leader.
+    def dispatch(self, api_key, request_key, tokens, call, timeout=None):
+        flight_key = (self._key_id(api_key), request_key)
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                flight = self._flights.get(flight_key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[flight_key] = _Flight()
+                    self._publish()
+                else:
+                    self.coalesced += 1
+                    registry.inc("uncgai_llm_coalesced_total")
+            if leader:
+                break
+            remaining = None if expires_at is None else max(0.0, expires_at - time.monotonic())
+            if not flight.done.wait(remaining):
+                with self._lock:
+                    self.queue_timeouts += 1
+                registry.inc("uncgai_llm_queue_timeouts_total")
+                raise QueueTimeout(f"No response from OpenAI within {timeout:g}s.")
+            if flight.abandoned:
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            remaining = None if expires_at is None else max(0.0, expires_at - time.monotonic())
+            self.acquire(api_key, tokens, remaining)
+            flight.result = call()
+            return flight.result, False
+        except Exception as e:
+            flight.error = e
+            raise
+        except BaseException:
+            flight.abandoned = True
+            raise
+        finally:
+            with self._lock:
+                del self._flights[flight_key]
+                self._publish()
+            flight.done.set()
+
+    # Requests waiting for rate-limit capacity and calls in flight, as gauges.
+    # Call with the lock held.
+    def _publish(self):
+        registry.set("uncgai_llm_queue_waiting", self.waiting)
+        registry.set("uncgai_llm_in_flight", len(self._flights))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "dispatched": self.dispatched,
+                "coalesced": self.coalesced,
+                "queued": self.queued,
+                "waiting": self.waiting,
+                "in_flight": len(self._flights),
+                "queue_wait_avg": self.queue_wait_total / self.queued if self.queued else 0.0,
+                "queue_wait_max": self.queue_wait_max,
+                "queue_timeouts": self.queue_timeouts,
+                "api_keys": len(self._buckets),
+            }
+
+
+dispatcher = Dispatcher()
@@ -0,0 +1,227 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import openai
+
+from llm_dispatch import QueueTimeout
+
+# Total seconds one completion may take, queueing, retries and hedges included
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", 90))
+# Longest a single HTTP attempt may wait for the server (for streams: between chunks)
+LLM_REQUEST_TIMEOUT = float(os.environ.get("LLM_REQUEST_TIMEOUT", 60))
+# Attempts per completion, and the exponential backoff between them
+LLM_MAX_ATTEMPTS = int(os.environ.get("LLM_MAX_ATTEMPTS", 3))
+LLM_RETRY_BASE_DELAY = float(os.environ.get("LLM_RETRY_BASE_DELAY", 0.5))
+LLM_RETRY_MAX_DELAY = float(os.environ.get("LLM_RETRY_MAX_DELAY", 8.0))
+# Send a second copy of a request still unanswered at the model's p95 latency.
+# Hedges are limited to LLM_HEDGE_RATIO of requests so an outage can't double the load.
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "1").lower() in ("1", "true", "yes")
+LLM_HEDGE_RATIO = float(os.environ.get("LLM_HEDGE_RATIO", 0.1))
+# Completions of a model in the last LLM_LATENCY_WINDOW seconds needed before its p95 is trusted
+LLM_LATENCY_MIN_SAMPLES = int(os.environ.get("LLM_LATENCY_MIN_SAMPLES", 20))
+LLM_LATENCY_WINDOW = float(os.environ.get("LLM_LATENCY_WINDOW", 300))
+# A model whose p95 latency is above this (or above the time left) is swapped for its fallback
+LLM_LATENCY_SLO = float(os.environ.get("LLM_LATENCY_SLO", 30))
+# A model's circuit opens when at least BREAKER_FAILURE_RATE of its last
+# BREAKER_WINDOW calls (and BREAKER_MIN_CALLS of them) hit an outage error,
+# and stays open for BREAKER_RESET_SECONDS
+BREAKER_WINDOW = int(os.environ.get("BREAKER_WINDOW", 20))
+BREAKER_MIN_CALLS = int(os.environ.get("BREAKER_MIN_CALLS", 10))
+BREAKER_FAILURE_RATE = float(os.environ.get("BREAKER_FAILURE_RATE", 0.5))
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", 30))
+
+FALLBACK_MODELS = {"gpt-4": "gpt-3.5-turbo", "gpt-4-turbo": "gpt-3.5-turbo"}
+
+
+class DeadlineExceeded(RuntimeError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+# Time budget for one completion, shared by everything done on its behalf
+class Deadline:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() == 0.0
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(f"No response from OpenAI within {self.seconds:g}s.")
+
+
+# Full-jitter exponential backoff; a Retry-After sent with a 429 is a lower bound
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = LLM_MAX_ATTEMPTS
+    base_delay: float = LLM_RETRY_BASE_DELAY
+    max_delay: float = LLM_RETRY_MAX_DELAY
+
+    def delay(self, attempt, error=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = _retry_after(error)
+        return min(self.max_delay, max(delay, retry_after)) if retry_after else delay
+
+
+def _retry_after(error):
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# Errors that say the service (not the request) is in trouble: timeouts,
+# dropped connections and 5xx responses. These count against the circuit breaker.
+def is_outage(error):
+    if isinstance(error, (openai.error.APIConnectionError, openai.error.Timeout,
+                          openai.error.ServiceUnavailableError, openai.error.TryAgain)):
+        return True
+    return isinstance(error, openai.error.APIError) and (error.http_status or 0) >= 500
+
+
+# Rate limits and outages are worth retrying; bad requests and authentication errors are not
+def is_retryable(error):
+    if isinstance(error, (openai.error.RateLimitError, QueueTimeout, DeadlineExceeded, CircuitOpenError)):
+        return True
+    return is_outage(error)
+
+
+# Per-model circuit breaker over a window of recent call outcomes. When too
+# many of them are outage errors the circuit opens and calls fail fast; once
+# `reset_seconds` have passed a single probe request is let through, and its
+# outcome closes or reopens the circuit.
+class CircuitBreaker:
+    def __init__(self, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS, failure_rate=BREAKER_FAILURE_RATE,
+                 reset_seconds=BREAKER_RESET_SECONDS):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._probing = False
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._probing = True
+            return True
+
+    # Any answer from the server, even an error about the request, shows it is up
+    def record(self, error=None):
+        failed = error is not None and is_outage(error)
+        with self._lock:
+            if self._probing:
+                self._probing = False
+                if failed:
+                    self._opened_at = time.monotonic()
+                else:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                return
+            if self._opened_at is not None:
+                # A call let through before the circuit opened
+                return
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= self.min_calls and \
+                    sum(self._outcomes) >= self.failure_rate * len(self._outcomes):
+                self._opened_at = time.monotonic()
+                self.times_opened += 1
+
+    def reset(self):
+        with self._lock:
+            self._outcomes.clear()
+            self._opened_at = None
+            self._probing = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(model):
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = _breakers[model] = CircuitBreaker()
+        return breaker
+
+
+def breaker_states():
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {model: breaker.state for model, breaker in sorted(breakers.items())}
+
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+# Each request earns LLM_HEDGE_RATIO of a hedge (banked up to `burst`), and a
+# hedge spends a whole one
+class HedgeBudget:
+    def __init__(self, ratio=LLM_HEDGE_RATIO, burst=10):
+        self.ratio = ratio
+        self.burst = burst
+        self.credit = 1.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.credit = min(self.burst, self.credit + self.ratio)
+
+    def spend(self):
+        with self._lock:
+            if self.credit < 1.0:
+                return False
+            self.credit -= 1.0
+            return True
+
+    def refund(self):
+        with self._lock:
+            self.credit = min(self.burst, self.credit + 1.0)
+
+    def reset(self):
+        with self._lock:
+            self.credit = 1.0
+
+
+hedge_budget = HedgeBudget()
+
+
+# Hedging and the latency SLO, read on every call so they can be changed
+# while the app runs
+@dataclass
+class LatencySettings:
+    hedge: bool = LLM_HEDGE
+    slo: float = LLM_LATENCY_SLO
+
+
+latency_settings = LatencySettings()
@@ -0,0 +1,323 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Serve Prometheus text format on http://METRICS_HOST:METRICS_PORT/metrics (0 disables it)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+# Also write every observation as a JSON log line
+METRICS_LOG = os.environ.get("METRICS_LOG", "").lower() in ("1", "true", "yes")
+# Show this session's timings in a sidebar panel
+METRICS_PANEL = os.environ.get("METRICS_PANEL", "").lower() in ("1", "true", "yes")
+# Sessions whose aggregates are kept (least recently active are dropped first)
+METRICS_SESSIONS = int(os.environ.get("METRICS_SESSIONS", 256))
+# Reruns slower than this are profiled and their stacks written to PROFILE_DIR (0 disables it)
+SLOW_RERUN_SECONDS = float(os.environ.get("SLOW_RERUN_SECONDS", 0))
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.005))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger(__name__)
+
+# Session the current rerun (or background task started from it) belongs to
+current_session = contextvars.ContextVar("metrics_session", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+# Process-wide counters and latency histograms, plus per-session totals.
+# Every update is a dict lookup and a few additions under one lock, cheap
+# enough to leave on in production.
+class MetricsRegistry:
+    def __init__(self, buckets=LATENCY_BUCKETS, max_sessions=METRICS_SESSIONS):
+        self.buckets = buckets
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._sessions = OrderedDict()
+
+    def inc(self, name, value=1, session=None, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._add_to_session(session, key, value)
+        self._log("counter", name, value, session, labels)
+
+    # Sum of a counter over all its label values
+    def counter_total(self, name):
+        with self._lock:
+            return sum(value for (counter, _), value in self._counters.items() if counter == name)
+
+    # Current value of a level (e.g. resident bytes); not attributed to sessions
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, session=None, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+            self._add_to_session(session, key, value)
+        self._log("histogram", name, value, session, labels)
+
+    def _add_to_session(self, session, key, value):
+        if session is None:
+            session = current_session.get()
+        if session is None:
+            return
+        totals = self._sessions.get(session)
+        if totals is None:
+            totals = self._sessions[session] = {}
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session)
+        entry = totals.setdefault(key, [0, 0.0])
+        entry[0] += 1
+        entry[1] += value
+
+    def _log(self, kind, name, value, session, labels):
+        if not METRICS_LOG:
+            return
+        record = {"metric": name, "type": kind, "value": value, **labels}
+        session = session or current_session.get()
+        if session is not None:
+            record["session"] = session
+        logger.info(json.dumps(record))
+
+    # Count and total of every metric one session has recorded, keyed by
+    # metric name plus labels (e.g. 'uncgai_operation_seconds{operation="inpaint"}')
+    def session_summary(self, session):
+        with self._lock:
+            totals = dict(self._sessions.get(session, {}))
+        return {
+            name + _format_labels(labels): {"count": count, "total": total}
+            for (name, labels), (count, total) in sorted(totals.items())
+        }
+
+    def forget_session(self, session):
+        with self._lock:
+            self._sessions.pop(session, None)
+
+    def render_prometheus(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((key, (list(h[0]), h[1], h[2])) for key, h in self._histograms.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), value in gauges:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), (bucket_counts, total, count) in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self._sessions.clear()
+
+
+registry = MetricsRegistry()
+
+
+# Time a block or function into uncgai_operation_seconds{operation=...}.
+# Works as a context manager (`with timed("inpaint"):`) and as a decorator
+# (`@timed("generate_response")`); failures are also counted in
+# uncgai_operation_errors_total.
+class timed:
+    def __init__(self, operation, session=None, **labels):
+        self.operation = operation
+        self.session = session
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start
+        registry.observe("uncgai_operation_seconds", self.elapsed, session=self.session,
+                         operation=self.operation, **self.labels)
+        if exc_type is not None:
+            registry.inc("uncgai_operation_errors_total", session=self.session,
+                         operation=self.operation, error=exc_type.__name__, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(self.operation, self.session, **self.labels):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+# Latency, time to first token and token counts of a finished llm_client.Completion
+def record_completion(completion):
+    model = completion.model
+    cached = "true" if completion.cached else "false"
+    registry.inc("uncgai_llm_requests_total", model=model, cached=cached)
+    registry.observe("uncgai_llm_request_seconds", completion.latency, model=model, cached=cached)
+    registry.observe("uncgai_llm_time_to_first_token_seconds", completion.time_to_first_token,
+                     model=model, cached=cached)
+    registry.inc("uncgai_llm_prompt_tokens_total", completion.prompt_tokens, model=model)
+    registry.inc("uncgai_llm_completion_tokens_total", completion.completion_tokens, model=model)
+
+
+# Samples one thread's Python stack every `interval` seconds from a helper
+# thread and counts identical stacks, in the "collapsed" format flame graph
+# tools read (outermost frame first, one "stack count" line per stack).
+class SamplingProfiler:
+    def __init__(self, thread_id=None, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name="rerun-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# Time one rerun of a page into uncgai_page_rerun_seconds{page=...} and
+# attribute everything recorded during it to `session`. With
+# SLOW_RERUN_SECONDS set, the rerun is sampled and slow ones are saved.
+@contextmanager
+def page_rerun(page, session=None):
+    token = current_session.set(session)
+    profiler = SamplingProfiler().start() if SLOW_RERUN_SECONDS > 0 else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe("uncgai_page_rerun_seconds", elapsed, page=page)
+        if profiler is not None:
+            profiler.stop()
+            if elapsed >= SLOW_RERUN_SECONDS:
+                _save_profile(profiler, page, elapsed)
+        current_session.reset(token)
+
+
+def _save_profile(profiler, page, elapsed):
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        slug = re.sub(r"[^a-z0-9]+", "-", page.lower()).strip("-")
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{int(elapsed * 1000)}ms.folded")
+        profiler.write_collapsed(path)
+        logger.warning("Slow rerun of %s (%.2fs); profile written to %s", page, elapsed, path)
+    except OSError:
+        logger.exception("Could not write rerun profile")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+_server_failed = False
+
+
+# Start the /metrics endpoint once per process (a no-op when METRICS_PORT is
+# unset or the endpoint is already running). Safe to call on every rerun.
+def start_http_server(port=METRICS_PORT, host=METRICS_HOST):
+    global _server, _server_failed
+    if not port or _server is not None or _server_failed:
+        return _server
+    with _server_lock:
+        if _server is None and not _server_failed:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                # e.g. another server process already owns the port
+                _server_failed = True
+                logger.exception("Could not start the metrics endpoint on %s:%s", host, port)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
@@ -0,0 +1,253 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from io import BytesIO
+
+import PyPDF2
+
+from metrics import registry
+from token_budget import estimate_tokens
+
+# Process-wide cache limits (override with environment variables)
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", "")
+
+# Documents with at least this many pages are extracted in a process pool
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 120))
+PDF_PARALLEL_WORKERS = int(os.environ.get("PDF_PARALLEL_WORKERS", min(4, os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = 16
+
+
+# Content-addressed cache for extracted PDF text.
+# Entries are keyed by the SHA-256 of the uploaded file bytes, kept in an
+# in-memory LRU bounded by total text size, and optionally mirrored to disk
+# so a restarted server starts warm.
+class ExtractionCache:
+    def __init__(self, max_bytes=PDF_CACHE_MAX_BYTES, disk_dir=PDF_CACHE_DIR or None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.txt")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                registry.inc("uncgai_pdf_cache_lookups_total", result="hit")
+                return self._entries[key][0]
+        text = self._read_disk(key)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                registry.inc("uncgai_pdf_cache_lookups_total", result="miss")
+                return None
+            self.disk_hits += 1
+            registry.inc("uncgai_pdf_cache_lookups_total", result="disk_hit")
+            self._store(key, text)
+        return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._store(key, text)
+        self._write_disk(key, text)
+
+    # Cache size as gauges; called whenever it changes. Call with the lock held.
+    def _publish(self):
+        registry.set("uncgai_pdf_cache_entries", len(self._entries))
+        registry.set("uncgai_pdf_cache_bytes", self._size)
+
+    def _store(self, key, text):
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        self._entries[key] = (text, size)
+        self._size += size
+        while self._size > self.max_bytes and self._entries:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self.evictions += 1
+            registry.inc("uncgai_pdf_cache_evictions_total")
+        self._publish()
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, text):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The disk tier is best effort; the in-memory copy is still valid
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._publish()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+extraction_cache = ExtractionCache()
+
+
+# Read the raw bytes of an uploaded file without disturbing its position
+def read_upload_bytes(uploaded_file):
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    position = uploaded_file.tell()
+    uploaded_file.seek(0)
+    data = uploaded_file.read()
+    uploaded_file.seek(position)
+    return data
+
+
+# Parse every page once and join the non-empty page texts
+def parse_pdf_text(data):
+    pdf_reader = PyPDF2.PdfReader(BytesIO(data))
+    page_texts = (page.extract_text() for page in pdf_reader.pages)
+    return "\n".join(text for text in page_texts if text)
+
+
+# Bytes of the PDF being parsed by a pool worker (set once per worker process)
+_worker_pdf_data = None
+
+
+def _init_page_worker(data):
+    global _worker_pdf_data
+    _worker_pdf_data = data
+
+
+def _extract_page_range(start, stop):
+    pdf_reader = PyPDF2.PdfReader(BytesIO(_worker_pdf_data))
+    return [pdf_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _pool_context():
+    methods = multiprocessing.get_all_start_methods()
+    # Never fork the multi-threaded Streamlit server directly
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+# Extract page ranges in a process pool and yield page texts in page order.
+# Only a small window of ranges is in flight, so a consumer that stops early
+# leaves the rest of the document unparsed.
+def _iter_pages_parallel(data, start, num_pages, workers):
+    ranges = deque(
+        (first, min(first + PDF_PAGES_PER_TASK, num_pages))
+        for first in range(start, num_pages, PDF_PAGES_PER_TASK)
+    )
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=_pool_context(),
+        initializer=_init_page_worker, initargs=(data,),
+    )
+    pending = deque()
+    try:
+        while ranges or pending:
+            while ranges and len(pending) < workers * 2:
+                pending.append(pool.submit(_extract_page_range, *ranges.popleft()))
+            yield from pending.popleft().result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Yield the text of each page in order, one page at a time.
+# parallel=True extracts every page in a process pool. By default, documents
+# with PDF_PARALLEL_MIN_PAGES or more pages read the first range inline and
+# only start the pool if the caller keeps consuming, so budgeted reads that
+# stop early never pay the pool start-up cost.
+def iter_page_texts(data, parallel=None, workers=PDF_PARALLEL_WORKERS):
+    pdf_reader = PyPDF2.PdfReader(BytesIO(data))
+    num_pages = len(pdf_reader.pages)
+    if workers < 2 or num_pages <= PDF_PAGES_PER_TASK:
+        parallel = False
+    if parallel is None:
+        parallel = num_pages >= PDF_PARALLEL_MIN_PAGES
+        inline_pages = PDF_PAGES_PER_TASK
+    else:
+        inline_pages = 0
+    if not parallel:
+        inline_pages = num_pages
+    for i in range(inline_pages):
+        yield pdf_reader.pages[i].extract_text() or ""
+    if inline_pages < num_pages:
+        yield from _iter_pages_parallel(data, inline_pages, num_pages, workers)
+
+
+# Extract text page by page until the word or token budget is exceeded.
+# Reading stops at the first page that takes the text past either budget, so
+# callers that truncate afterwards (see truncate_text) still know whether the
+# document was longer than the budget.
+def extract_text_budgeted(data, max_words=None, max_tokens=None, parallel=None):
+    parts = []
+    words = tokens = 0
+    with closing(iter_page_texts(data, parallel=parallel)) as pages:
+        for text in pages:
+            if not text:
+                continue
+            parts.append(text)
+            words += len(text.split())
+            if max_tokens is not None:
+                tokens += estimate_tokens(text)
+            if (max_words is not None and words > max_words) or (max_tokens is not None and tokens > max_tokens):
+                break
+    return "\n".join(parts)
+
+
+# Extract text from PDF bytes, reusing any previous extraction of the same file.
+# Budgeted extractions are cached separately from full ones.
+def extract_text_cached(data, max_words=None, max_tokens=None, cache=extraction_cache):
+    key = cache.key_for(data)
+    if max_words is not None or max_tokens is not None:
+        key = f"{key}-w{max_words}-t{max_tokens}"
+    text = cache.get(key)
+    if text is None:
+        text = extract_text_budgeted(data, max_words=max_words, max_tokens=max_tokens)
+        cache.put(key, text)
+    return text
@@ -0,0 +1,133 @@
+import hashlib
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from token_budget import estimate_tokens
+
+CHUNK_WORDS = 120
+CHUNK_OVERLAP = 30
+INDEX_CACHE_SIZE = 64
+
+_TERM = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i if in into is it its my of on or our "
+    "so that the their then there these this to was we were what when which will with you your".split()
+)
+
+
+def tokenize(text):
+    return [t for t in _TERM.findall(text.lower()) if t not in _STOPWORDS]
+
+
+# Split text into overlapping windows of words
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    words = text.split()
+    if not words:
+        return []
+    step = max(1, chunk_words - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+# Okapi BM25 over document chunks.
+# Postings are stored as flat NumPy arrays grouped by term (an inverted
+# index in CSR layout), so scoring a query touches only the postings of
+# its terms.
+class BM25Index:
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        term_ids, doc_ids, counts = [], [], []
+        doc_lengths = np.zeros(len(chunks), dtype=np.float32)
+        for doc_id, chunk in enumerate(chunks):
+            terms = Counter(tokenize(chunk))
+            doc_lengths[doc_id] = sum(terms.values())
+            for term, count in terms.items():
+                term_ids.append(self.vocab.setdefault(term, len(self.vocab)))
+                doc_ids.append(doc_id)
+                counts.append(count)
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind="stable")
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)[order]
+        self.counts = np.asarray(counts, dtype=np.float32)[order]
+        self.offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(self.vocab)), out=self.offsets[1:])
+        doc_freq = np.diff(self.offsets).astype(np.float32)
+        n = len(chunks)
+        self.idf = np.log1p((n - doc_freq + 0.5) / (doc_freq + 0.5))
+        avg_length = doc_lengths.mean() if n else 0.0
+        self.length_norm = k1 * (1 - b + b * doc_lengths / (avg_length or 1.0))
+
+    def scores(self, query):
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            lo, hi = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[lo:hi]
+            tf = self.counts[lo:hi]
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.length_norm[docs])
+        return scores
+
+    # Indices of the k best-scoring chunks, best first (empty if nothing matches)
+    def search(self, query, k):
+        scores = self.scores(query)
+        matching = np.flatnonzero(scores > 0)
+        if len(matching) > k:
+            matching = matching[np.argpartition(scores[matching], -k)[-k:]]
+        return matching[np.argsort(-scores[matching], kind="stable")].tolist()
+
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def document_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# BM25 index for a document, built once per document hash and kept in a
+# small process-wide LRU
+def get_index(text, doc_key=None):
+    doc_key = doc_key or document_key(text)
+    with _index_lock:
+        index = _index_cache.get(doc_key)
+        if index is not None:
+            _index_cache.move_to_end(doc_key)
+            return index
+    index = BM25Index(chunk_text(text))
+    with _index_lock:
+        _index_cache[doc_key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+# Pick the parts of `text` most relevant to `query` that fit in `max_tokens`.
+# Short documents are returned whole. Otherwise the top-k BM25 chunks are
+# packed best-first until the budget is full, then put back in document
+# order; if the query matches nothing the opening chunks are used.
+def retrieve_context(text, query, max_tokens, k=8, doc_key=None):
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    index = get_index(text, doc_key)
+    ranked = index.search(query, k) or range(len(index.chunks))
+    selected = []
+    used = 0
+    for chunk_id in ranked:
+        cost = estimate_tokens(index.chunks[chunk_id])
+        if used + cost > max_tokens:
+            continue
+        selected.append(chunk_id)
+        used += cost
+    return "\n...\n".join(index.chunks[i] for i in sorted(selected))
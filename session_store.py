@@ -0,0 +1,382 @@
+import atexit
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from itertools import islice
+
+from background import executor
+from metrics import registry
+
+# Resident bytes one session's stored values may use before the least
+# recently used ones are spilled to disk
+SESSION_MEMORY_CAP = int(float(os.environ.get("SESSION_MEMORY_CAP_MB", 8)) * 1024 * 1024)
+# Values smaller than this are never worth spilling
+SESSION_SPILL_MIN_BYTES = int(os.environ.get("SESSION_SPILL_MIN_BYTES", 64 * 1024))
+# Values unused for this long are spilled even under the cap
+SESSION_COLD_SECONDS = float(os.environ.get("SESSION_COLD_SECONDS", 600))
+# Sessions without a rerun for this long are spilled entirely and their
+# background work dropped; after SESSION_EXPIRE_SECONDS their data is deleted
+SESSION_IDLE_SECONDS = float(os.environ.get("SESSION_IDLE_SECONDS", 1800))
+SESSION_EXPIRE_SECONDS = float(os.environ.get("SESSION_EXPIRE_SECONDS", 12 * 3600))
+SESSION_SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", 60))
+# Values that only grow (chat histories, interaction logs) are re-measured by
+# their new items; every SESSION_REMEASURE_EVERY reruns they are measured whole
+# to catch items that changed in place
+SESSION_REMEASURE_EVERY = int(os.environ.get("SESSION_REMEASURE_EVERY", 16))
+SESSION_SPILL_DIR = os.environ.get("SESSION_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "uncgai-sessions")
+
+logger = logging.getLogger(__name__)
+
+
+# Approximate memory held by a value and everything it references: pandas
+# and numpy objects report their buffers, containers and plain objects are
+# walked (shared objects are counted once)
+def approx_size(value, _seen=None):
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage) and hasattr(value, "columns"):
+        return int(memory_usage(deep=True).sum())
+    if hasattr(value, "nbytes") and hasattr(value, "dtype"):
+        return int(value.nbytes)
+    size = sys.getsizeof(value, 0)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += approx_size(key, seen) + approx_size(item, seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += approx_size(item, seen)
+    elif hasattr(value, "__dict__"):
+        size += approx_size(vars(value), seen)
+    return size
+
+
+class _Entry:
+    def __init__(self, value, cache):
+        self.value = value
+        # Caches are dropped instead of written to disk
+        self.cache = cache
+        self.nbytes = 0
+        self.used_at = time.monotonic()
+        self.path = None
+        self.stored_bytes = 0
+        self.pinned = False
+        # The list or dict last measured, its length and container size then,
+        # for measuring only what was added since
+        self.measured = None
+        self.measured_len = 0
+        self.measured_container = 0
+        self.measured_reruns = 0
+        # Set by put(): the value doesn't change in place and keeps its first size
+        self.fixed = False
+
+    # Size of the value after a rerun that read it. A list or dict that was
+    # measured before and has not shrunk adds the size of its new items; other
+    # values, and every SESSION_REMEASURE_EVERY-th rerun, are measured whole.
+    def remeasure(self):
+        if self.fixed:
+            return
+        value = self.value
+        self.measured_reruns += 1
+        incremental = (
+            value is self.measured and isinstance(value, (list, dict)) and len(value) >= self.measured_len
+            and self.measured_reruns < SESSION_REMEASURE_EVERY
+        )
+        if incremental:
+            container = sys.getsizeof(value, 0) - self.measured_container
+            seen = set()
+            if isinstance(value, list):
+                added = sum(approx_size(item, seen) for item in value[self.measured_len:])
+            else:
+                added = sum(approx_size(key, seen) + approx_size(item, seen)
+                            for key, item in islice(value.items(), self.measured_len, None))
+            self.nbytes += container + added
+        else:
+            self.nbytes = approx_size(value)
+            self.measured_reruns = 0
+        self.measured = value if isinstance(value, (list, dict)) else None
+        self.measured_len = len(value) if self.measured is not None else 0
+        self.measured_container = sys.getsizeof(value, 0)
+
+    @property
+    def resident(self):
+        return self.path is None
+
+
+class _Session:
+    def __init__(self):
+        self.entries = {}
+        self.active_at = time.monotonic()
+        self.running = 0
+        self.accessed = set()
+        self.idle = False
+
+
+# Per-session values that can grow over a class day (chat history, the
+# interaction log, uploaded datasets), kept outside st.session_state so the
+# process can account for them and bound them. Each session's resident
+# values are held under SESSION_MEMORY_CAP by spilling the least recently
+# used ones to compressed pickles on disk; they are loaded back the next
+# time they are read. Idle sessions are spilled whole and eventually deleted.
+class SessionStore:
+    def __init__(self, memory_cap=SESSION_MEMORY_CAP, spill_dir=SESSION_SPILL_DIR):
+        self.memory_cap = memory_cap
+        self.spill_dir = spill_dir
+        self._root = None
+        self._lock = threading.RLock()
+        self._sessions = {}
+        self._swept_at = time.monotonic()
+        self.spills = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.drops = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # The value stored under `key` for a session, created with `factory()` on
+    # first use and loaded back from disk if it was spilled
+    def get(self, session, key, factory, cache=False):
+        with self._lock:
+            state = self._session(session)
+            entry = state.entries.get(key)
+            if entry is None:
+                entry = state.entries[key] = _Entry(factory(), cache)
+            elif not entry.resident:
+                self._load(key, entry, factory)
+            elif entry.value is None and entry.cache:
+                entry.value = factory()
+            entry.used_at = time.monotonic()
+            state.accessed.add(key)
+            return entry.value
+
+    # Store a finished value that won't change in place (e.g. a background
+    # result), replacing what was under `key`; it is measured once, here
+    def put(self, session, key, value, cache=False):
+        with self._lock:
+            state = self._session(session)
+            previous = state.entries.get(key)
+            if previous is not None and previous.path is not None:
+                _remove(previous.path)
+            entry = state.entries[key] = _Entry(value, cache)
+            entry.nbytes = approx_size(value)
+            entry.fixed = True
+
+    def _session(self, session):
+        state = self._sessions.get(session)
+        if state is None:
+            state = self._sessions[session] = _Session()
+        state.active_at = time.monotonic()
+        state.idle = False
+        return state
+
+    # Wrap one rerun of a session: values read during it are re-measured when
+    # it ends (they may have grown in place; see _Entry.remeasure), then the session is brought back
+    # under the cap and, now and then, idle sessions are swept
+    @contextmanager
+    def rerun(self, session):
+        with self._lock:
+            self._session(session).running += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                state = self._sessions.get(session)
+                if state is not None:
+                    state.running -= 1
+                    for key in state.accessed:
+                        entry = state.entries.get(key)
+                        if entry is not None and entry.resident and entry.value is not None:
+                            entry.remeasure()
+                    state.accessed.clear()
+                    if not state.running:
+                        self._enforce(session, state)
+            self.sweep()
+            self._publish()
+
+    def _publish(self):
+        stats = self.stats()
+        registry.set("uncgai_sessions", stats["sessions"])
+        registry.set("uncgai_session_resident_bytes", stats["resident_bytes"])
+        registry.set("uncgai_session_spilled_bytes", stats["spilled_bytes"])
+        registry.set("uncgai_session_largest_bytes", stats["largest_session_bytes"])
+
+    def _enforce(self, session, state):
+        now = time.monotonic()
+        candidates = sorted(
+            (entry.used_at, key) for key, entry in state.entries.items()
+            if entry.resident and entry.value is not None and not entry.pinned
+            and entry.nbytes >= SESSION_SPILL_MIN_BYTES
+        )
+        resident = self._resident_bytes(state)
+        for used_at, key in candidates:
+            if resident <= self.memory_cap and now - used_at < SESSION_COLD_SECONDS:
+                break
+            entry = state.entries[key]
+            nbytes = entry.nbytes
+            if self._spill(session, key, entry):
+                resident -= nbytes
+
+    @staticmethod
+    def _resident_bytes(state):
+        return sum(entry.nbytes for entry in state.entries.values() if entry.resident and entry.value is not None)
+
+    def _spill(self, session, key, entry):
+        entry.measured = None
+        if entry.cache:
+            entry.value = None
+            entry.nbytes = 0
+            self.drops += 1
+            return True
+        try:
+            data = zlib.compress(pickle.dumps(entry.value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # e.g. holds a lock; it stays resident (and counted)
+            entry.pinned = True
+            return False
+        try:
+            directory = os.path.join(self._spill_root(), session)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{key}.pkl.z")
+            temporary = f"{path}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except OSError:
+            logger.exception("Could not spill session value %r to disk", key)
+            return False
+        entry.path = path
+        entry.stored_bytes = len(data)
+        entry.value = None
+        self.spills += 1
+        registry.inc("uncgai_session_spills_total", key=key)
+        return True
+
+    # A spill file that was removed (e.g. by a tmp cleaner) or is unreadable
+    # loses that value: it starts over from factory() instead of failing every rerun
+    def _load(self, key, entry, factory):
+        try:
+            with open(entry.path, "rb") as f:
+                entry.value = pickle.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            logger.error("Could not load spilled session value %r from %s (%s); starting it over",
+                         key, entry.path, e)
+            entry.value = factory()
+            self.load_errors += 1
+            registry.inc("uncgai_session_load_errors_total", key=key)
+        else:
+            self.loads += 1
+            registry.inc("uncgai_session_loads_total")
+        _remove(entry.path)
+        entry.path = None
+        entry.stored_bytes = 0
+
+    # One directory per process under spill_dir, removed at exit; directories
+    # left behind by processes that died are removed once they expire
+    def _spill_root(self):
+        if self._root is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            cutoff = time.time() - SESSION_EXPIRE_SECONDS
+            for name in os.listdir(self.spill_dir):
+                path = os.path.join(self.spill_dir, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        shutil.rmtree(path, ignore_errors=True)
+                except OSError:
+                    pass
+            self._root = tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=self.spill_dir)
+            atexit.register(shutil.rmtree, self._root, True)
+        return self._root
+
+    # Spill every session idle for SESSION_IDLE_SECONDS and forget the ones
+    # idle for SESSION_EXPIRE_SECONDS (at most once per SESSION_SWEEP_INTERVAL
+    # unless forced). Returns the sessions that were expired.
+    def sweep(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._swept_at < SESSION_SWEEP_INTERVAL:
+                return []
+            self._swept_at = now
+            expired, idle = [], []
+            for session, state in list(self._sessions.items()):
+                if state.running:
+                    continue
+                idle_for = now - state.active_at
+                if idle_for >= SESSION_EXPIRE_SECONDS:
+                    self._delete(session)
+                    expired.append(session)
+                    self.expirations += 1
+                elif idle_for >= SESSION_IDLE_SECONDS and not state.idle:
+                    for key, entry in state.entries.items():
+                        if entry.resident and entry.value is not None:
+                            self._spill(session, key, entry)
+                    state.idle = True
+                    self.evictions += 1
+                    idle.append(session)
+        for session in idle + expired:
+            _on_idle(session)
+        return expired
+
+    def _delete(self, session):
+        state = self._sessions.pop(session, None)
+        if state is not None and self._root is not None:
+            shutil.rmtree(os.path.join(self._root, session), ignore_errors=True)
+
+    def forget(self, session):
+        with self._lock:
+            self._delete(session)
+
+    # Bytes held in memory and on disk per stored value of one session
+    def session_usage(self, session):
+        with self._lock:
+            state = self._sessions.get(session)
+            if state is None:
+                return {}
+            return {
+                key: {"bytes": entry.nbytes if entry.resident else 0, "spilled_bytes": entry.stored_bytes}
+                for key, entry in sorted(state.entries.items())
+            }
+
+    def stats(self):
+        with self._lock:
+            states = list(self._sessions.values())
+            entries = [entry for state in states for entry in state.entries.values()]
+            return {
+                "sessions": len(states),
+                "idle_sessions": sum(state.idle for state in states),
+                "resident_bytes": sum(self._resident_bytes(state) for state in states),
+                "spilled_bytes": sum(entry.stored_bytes for entry in entries),
+                "largest_session_bytes": max((self._resident_bytes(state) for state in states), default=0),
+                "spills": self.spills,
+                "loads": self.loads,
+                "load_errors": self.load_errors,
+                "drops": self.drops,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Background results and per-session metrics of an idle session are dropped too
+def _on_idle(session):
+    executor.forget(session)
+    registry.forget_session(session)
+
+
+session_store = SessionStore()
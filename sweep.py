@@ -0,0 +1,80 @@
+import contextvars
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Optional
+
+# Combinations one sweep may send, and how many run at once (the shared rate
+# limiter still applies)
+SWEEP_MAX_VARIANTS = int(os.environ.get("SWEEP_MAX_VARIANTS", 8))
+SWEEP_CONCURRENCY = int(os.environ.get("SWEEP_CONCURRENCY", 8))
+
+
+# One (model, temperature, max_tokens) combination in a parameter sweep
+@dataclass(frozen=True)
+class Variant:
+    model: str
+    temperature: float
+    max_tokens: int
+
+    @property
+    def label(self):
+        return f"{self.model} · temperature {self.temperature:g} · {self.max_tokens} tokens"
+
+
+@dataclass
+class VariantResult:
+    variant: Variant
+    response: Optional[str] = None
+    error: Optional[str] = None
+    latency: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached: bool = False
+    # Model that answered (differs from variant.model after a fallback)
+    model: Optional[str] = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+# Every combination of the chosen models, temperatures and response lengths
+def make_variants(models, temperatures, max_tokens):
+    return [Variant(model, float(temperature), int(tokens))
+            for model, temperature, tokens in itertools.product(models, temperatures, max_tokens)]
+
+
+# Run `call(variant, on_completion)` (a blocking function returning the
+# response text, which passes its llm_client.Completion to `on_completion`)
+# for every variant on a thread pool, yielding (position, VariantResult) in
+# completion order. The whole sweep takes about as long as its slowest call.
+def run_sweep(variants, call, concurrency=SWEEP_CONCURRENCY):
+    def run(variant):
+        completions = []
+        start = time.perf_counter()
+        try:
+            response = call(variant, completions.append)
+        except Exception as e:
+            return VariantResult(variant, error=f"{type(e).__name__}: {e}", latency=time.perf_counter() - start)
+        result = VariantResult(variant, response=response, latency=time.perf_counter() - start)
+        if completions:
+            result.prompt_tokens = completions[-1].prompt_tokens
+            result.completion_tokens = completions[-1].completion_tokens
+            result.cached = completions[-1].cached
+            result.model = completions[-1].model
+        return result
+
+    if not variants:
+        return
+    pool = ThreadPoolExecutor(max_workers=min(concurrency, len(variants)), thread_name_prefix="sweep")
+    try:
+        # Keep the caller's context (e.g. the metrics session) in the worker threads
+        futures = {pool.submit(contextvars.copy_context().run, run, variant): position
+                   for position, variant in enumerate(variants)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
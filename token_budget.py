@@ -0,0 +1,17 @@
+import re
+
+# Rough characters-per-token ratio for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+_WORD_OR_SYMBOL = re.compile(r"\w+|[^\w\s]")
+
+
+# Estimate the number of tokens in a piece of text without a tokenizer.
+# Takes the larger of a character-based and a word/punctuation-based count,
+# which tracks tiktoken closely enough for budgeting prompts.
+def estimate_tokens(text):
+    if not text:
+        return 0
+    by_chars = len(text) / CHARS_PER_TOKEN
+    by_words = len(_WORD_OR_SYMBOL.findall(text))
+    return int(max(by_chars, by_words)) + 1
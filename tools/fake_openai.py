@@ -0,0 +1,239 @@
+"""Local OpenAI-compatible chat completions server for development and tests.
+
+Start it and point the app at it:
+
+    python -m tools.fake_openai --port 8001
+    OPENAI_API_BASE=http://127.0.0.1:8001/v1 streamlit run app.py
+
+Replies echo the last user message, one word per token, so output is
+deterministic. Streaming requests get server-sent events like the real API.
+For load tests it can add random latency (--latency-jitter) and answer a
+fraction of requests with 429 rate-limit errors (--rate-limit-rate). To
+exercise the client's timeouts, retries, hedging and circuit breaker it can
+also answer with 503 errors (--error-rate), hang before answering
+(--stall-rate, --stall-seconds) and slow down one model (--model-delay
+gpt-4=5). All of these can be changed on a running FakeOpenAIServer.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Build a deterministic reply for a chat request
+def fake_reply_words(messages, max_tokens):
+    last_user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+    words = ["Echo:"] + last_user.split()
+    return words[:max_tokens or 16]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY every
+    # keep-alive response stalls ~40 ms on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+        self.server.request_count += 1
+        model = body.get("model", "gpt-3.5-turbo")
+        self.server.model_counts[model] += 1
+        if self.server.should_rate_limit():
+            self._send_json(429, {"error": {
+                "message": "Rate limit reached for requests (fake server). Please try again shortly.",
+                "type": "requests", "code": "rate_limit_exceeded",
+            }}, headers={"Retry-After": "1"})
+            return
+        if self.server.should_fail():
+            self._send_json(503, {"error": {
+                "message": "The server is overloaded or not ready yet (fake server).",
+                "type": "server_error", "code": None,
+            }})
+            return
+        words = fake_reply_words(body.get("messages", []), body.get("max_tokens"))
+        time.sleep(self.server.first_token_latency(model))
+        if body.get("stream"):
+            self._stream(model, words)
+        else:
+            time.sleep(self.server.token_delay * len(words))
+            text = " ".join(words)
+            prompt_tokens = sum(len(m["content"].split()) for m in body.get("messages", []))
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                          "total_tokens": prompt_tokens + len(words)},
+            })
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, model, words):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        event({"role": "assistant"})
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.token_delay)
+            event({"content": word if i == 0 else " " + word})
+        event({}, finish_reason="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+# Threaded fake server; use as a context manager or call start()/stop()
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, first_token_delay=0.0, token_delay=0.0,
+                 latency_jitter=0.0, rate_limit_rate=0.0, seed=None, error_rate=0.0, stall_rate=0.0,
+                 stall_seconds=30.0, model_delays=None):
+        super().__init__((host, port), _Handler)
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        # Up to this many extra seconds before the first token, uniformly random
+        self.latency_jitter = latency_jitter
+        # Fraction of chat requests answered with HTTP 429
+        self.rate_limit_rate = rate_limit_rate
+        # Fraction answered with HTTP 503, and fraction that hang for stall_seconds first
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        # Extra seconds before the first token, per model
+        self.model_delays = dict(model_delays or {})
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.error_count = 0
+        self.stall_count = 0
+        self.model_counts = Counter()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._thread = None
+
+    def should_rate_limit(self):
+        if not self.rate_limit_rate:
+            return False
+        with self._random_lock:
+            limited = self._random.random() < self.rate_limit_rate
+            self.rate_limited_count += limited
+        return limited
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._random_lock:
+            failed = self._random.random() < self.error_rate
+            self.error_count += failed
+        return failed
+
+    def first_token_latency(self, model=None):
+        delay = self.first_token_delay + self.model_delays.get(model, 0.0)
+        if not (self.latency_jitter or self.stall_rate):
+            return delay
+        with self._random_lock:
+            if self.stall_rate and self._random.random() < self.stall_rate:
+                self.stall_count += 1
+                delay += self.stall_seconds
+            if self.latency_jitter:
+                delay += self._random.uniform(0, self.latency_jitter)
+        return delay
+
+    # Clients that gave up (timeouts, abandoned hedges) close the connection mid-reply
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def api_base(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of requests that hang first")
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument("--model-delay", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="extra latency for one model (repeatable)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    model_delays = {}
+    for item in args.model_delay:
+        model, _, seconds = item.partition("=")
+        model_delays[model] = float(seconds)
+    server = FakeOpenAIServer(args.host, args.port, args.first_token_delay, args.token_delay,
+                              args.latency_jitter, args.rate_limit_rate, args.seed, args.error_rate,
+                              args.stall_rate, args.stall_seconds, model_delays)
+    print(f"Fake OpenAI API listening on {server.api_base}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
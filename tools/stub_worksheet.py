@@ -0,0 +1,24 @@
+import threading
+import time
+
+
+# Local stand-in for a gspread Worksheet, for exercising the Google Sheets
+# interaction log without network access. Can simulate slow or failing calls.
+class StubWorksheet:
+    def __init__(self, latency=0.0, fail_every=0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.rows = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def append_rows(self, values, value_input_option="RAW"):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.latency)
+        if self.fail_every and calls % self.fail_every == 0:
+            raise ConnectionError("Simulated Google Sheets API failure")
+        with self._lock:
+            self.rows.extend(list(row) for row in values)
+        return {"updates": {"updatedRows": len(values)}}